@@ -4,70 +4,216 @@ Convert all mono audio files in the client/audio directory to stereo PCM format.
 This enables proper panning functionality in the extension.
 """
 
+import itertools
 import os
+import queue
+import shutil
+import struct
 import sys
+import threading
 from pathlib import Path
-from pydub import AudioSegment
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 import argparse
 
+# numpy and soundfile are imported lazily so argparse/--help doesn't pay
+# their startup cost; load_audio_libs() also runs in spawned pool workers,
+# where main() never executes
+np = None
+sf = None
+
+def load_audio_libs():
+    """Bind numpy/soundfile into module globals on first use."""
+    global np, sf
+    if np is None:
+        import numpy
+        import soundfile
+        np = numpy
+        sf = soundfile
+
 def find_wav_files(audio_root):
-    """Find all .wav files in the audio directory structure."""
-    wav_files = []
-    for root, dirs, files in os.walk(audio_root):
-        for file in files:
-            if file.lower().endswith('.wav'):
-                wav_files.append(os.path.join(root, file))
-    return sorted(wav_files)
-
-def is_mono(audio_file):
-    """Check if an audio file is mono (1 channel)."""
+    """Yield all .wav files under audio_root using os.scandir.
+
+    scandir reuses the directory entry metadata from the kernel, so we can
+    classify files vs directories without issuing an extra stat() per entry
+    the way os.walk does. Yielding lets file discovery overlap with the
+    analysis loop instead of materializing the whole list up front.
+    """
+    stack = [os.fspath(audio_root)]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith('.wav') and entry.is_file(follow_symlinks=False):
+                    yield entry.path
+
+def wav_info(audio_file):
+    """Read (channels, sample_rate) from the fixed WAV header offsets via mmap.
+
+    np.memmap returns before any bytes are paged in; touching the header
+    fields costs one minor fault, so the batch scan is bound by disk seeks
+    rather than per-file read() syscalls. Returns (0, 0) for unreadable or
+    non-RIFF files so they are treated as not-mono, matching the old error
+    behavior.
+    """
     try:
-        audio = AudioSegment.from_wav(audio_file)
-        return audio.channels == 1
+        header = np.memmap(audio_file, dtype=np.uint8, mode='r', shape=(44,))
+        try:
+            if bytes(header[:4]) != b'RIFF' or bytes(header[8:12]) != b'WAVE':
+                raise ValueError("not a RIFF/WAVE file")
+            channels = int(header[22]) | (int(header[23]) << 8)
+            sample_rate = int.from_bytes(bytes(header[24:28]), 'little')
+        finally:
+            # Drop the mapping promptly so huge batches don't exhaust FDs
+            del header
+        return channels, sample_rate
     except Exception as e:
         print(f"Error reading {audio_file}: {e}")
-        return False
+        return 0, 0
+
+# Frames per decode block when streaming a file through the converter
+BLOCK_FRAMES = 65536
+
+# Paths per batch when streaming the walk through the header-scan pool
+SCAN_BATCH = 256
+
+def stream_blocks(snd):
+    """Yield decode blocks prefetched one ahead on a background thread.
+
+    libsndfile releases the GIL while decoding, so a producer thread with
+    a bounded queue lets the decode of block N+1 overlap the disk write of
+    block N instead of serializing the two stages.
+    """
+    blocks = queue.Queue(maxsize=2)
+
+    def producer():
+        try:
+            for block in snd.blocks(blocksize=BLOCK_FRAMES,
+                                    dtype='int16', always_2d=True):
+                blocks.put(block)
+            blocks.put(None)
+        except BaseException as e:
+            blocks.put(e)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    while True:
+        item = blocks.get()
+        if item is None:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    thread.join()
+
+def copy_stereo_pcm_payload(audio_file, pcm_file):
+    """Copy the sample bytes of a 16-bit PCM stereo WAV straight to pcm_file.
+
+    For conformant files the data chunk is bit-identical to the raw s16le
+    output, so stripping the header is all the conversion there is. Returns
+    False (writing nothing) if the file is not plain 16-bit PCM stereo, in
+    which case the caller falls back to the decode path.
+    """
+    with open(audio_file, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return False
+        audio_format = channels = bits = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return False
+            chunk_id, chunk_size = chunk_header[:4], struct.unpack('<I', chunk_header[4:8])[0]
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if len(fmt) < 16:
+                    return False
+                audio_format, channels = struct.unpack('<HH', fmt[:4])
+                bits = struct.unpack('<H', fmt[14:16])[0]
+            elif chunk_id == b'data':
+                if (audio_format, channels, bits) != (1, 2, 16):
+                    return False
+                with open(pcm_file, 'wb') as out:
+                    remaining = chunk_size
+                    while remaining > 0:
+                        buf = f.read(min(remaining, 1 << 20))
+                        if not buf:
+                            break
+                        out.write(buf)
+                        remaining -= len(buf)
+                    out.flush()
+                    os.fsync(out.fileno())
+                return True
+            else:
+                # Skip unrelated chunks (chunks are word-aligned)
+                f.seek(chunk_size + (chunk_size & 1), 1)
 
 def convert_to_stereo(audio_file, backup=True):
-    """Convert a mono audio file to stereo and save as PCM."""
+    """Convert a mono audio file to stereo and save as PCM.
+
+    The decode is streamed block-by-block from libsndfile straight into
+    the .pcm output (and the backup WAV, when requested), so memory stays
+    bounded and no whole-file intermediate buffer is materialized.
+    """
+    load_audio_libs()
     try:
-        # Load the mono audio
-        mono_audio = AudioSegment.from_wav(audio_file)
-        
-        if mono_audio.channels == 1:
-            # Create backup if requested
-            if backup:
-                backup_path = audio_file + '.mono_backup'
-                mono_audio.export(backup_path, format="wav")
-                print(f"  Backup saved: {backup_path}")
-            
-            # Convert mono to stereo by duplicating the channel
-            stereo_audio = AudioSegment.from_mono_audiosegments(mono_audio, mono_audio)
-            
-            # Change file extension from .wav to .pcm
-            pcm_file = audio_file.rsplit('.wav', 1)[0] + '.pcm'
-            
-            # Export as raw PCM (16-bit signed, little-endian) at original sample rate
-            # Keep original sample rate (typically 24kHz)
-            stereo_audio.export(pcm_file, format="s16le")
-            
-            # Remove the original WAV file
-            os.remove(audio_file)
-            
-            print(f"  ✓ Converted to stereo PCM: {stereo_audio.channels} channels, {stereo_audio.frame_rate}Hz, 16-bit")
-            print(f"  📁 Saved as: {os.path.basename(pcm_file)}")
-            return True
-        else:
-            print(f"  Already stereo ({mono_audio.channels} channels)")
-            # If already stereo, still convert to PCM format at original sample rate
-            pcm_file = audio_file.rsplit('.wav', 1)[0] + '.pcm'
-            # Keep original sample rate
-            stereo_audio = mono_audio
-            stereo_audio.export(pcm_file, format="s16le")
-            os.remove(audio_file)
-            print(f"  📁 Converted WAV to PCM ({stereo_audio.frame_rate}Hz): {os.path.basename(pcm_file)}")
+        # Fast path: an already-stereo 16-bit PCM WAV needs no decode at
+        # all — its data chunk is byte-for-byte the .pcm output. Output is
+        # staged to a .tmp sibling and renamed once fully flushed, so the
+        # original only vanishes after a complete .pcm exists
+        pcm_file = audio_file.rsplit('.wav', 1)[0] + '.pcm'
+        tmp_file = pcm_file + '.tmp'
+        if copy_stereo_pcm_payload(audio_file, tmp_file):
+            print("  Already stereo (2 channels)")
+            os.rename(tmp_file, pcm_file)
+            os.unlink(audio_file)
+            print(f"  📁 Copied WAV payload to PCM: {os.path.basename(pcm_file)}")
             return True
-            
+
+        with sf.SoundFile(audio_file) as snd:
+            sample_rate = snd.samplerate
+            channels = snd.channels
+
+            if channels == 1:
+                # Back up the original bytes verbatim — no decode/re-encode,
+                # and the backup stays bit-identical to the source
+                if backup:
+                    backup_path = audio_file + '.mono_backup'
+                    shutil.copyfile(audio_file, backup_path)
+                    print(f"  Backup saved: {backup_path}")
+
+                # One preallocated interleave buffer reused for every block
+                # instead of np.repeat allocating a fresh array each time
+                stereo_buf = np.empty((BLOCK_FRAMES, 2), dtype='<i2')
+                with open(tmp_file, 'wb') as out:
+                    for block in stream_blocks(snd):
+                        frames = stereo_buf[:block.shape[0]]
+                        # Broadcast the mono column into both channels; the
+                        # buffer is already the interleaved s16le layout
+                        frames[:] = block[:, :1]
+                        frames.tofile(out)
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                print(f"  ✓ Converted to stereo PCM: 2 channels, {sample_rate}Hz, 16-bit")
+                print(f"  📁 Saved as: {os.path.basename(pcm_file)}")
+            else:
+                print(f"  Already stereo ({channels} channels)")
+                # If already stereo, still convert to PCM format at original sample rate
+                with open(tmp_file, 'wb') as out:
+                    for block in stream_blocks(snd):
+                        block.astype('<i2', copy=False).tofile(out)
+                    out.flush()
+                    os.fsync(out.fileno())
+                print(f"  📁 Converted WAV to PCM ({sample_rate}Hz): {os.path.basename(pcm_file)}")
+
+        # Atomically publish the output, then remove the original WAV
+        os.rename(tmp_file, pcm_file)
+        os.unlink(audio_file)
+        return True
+
     except Exception as e:
         print(f"  ✗ Error converting {audio_file}: {e}")
         return False
@@ -78,6 +224,7 @@ def main():
     parser.add_argument('--audio-dir', default='audio', help='Audio directory path (default: audio)')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be converted without actually converting')
     args = parser.parse_args()
+    load_audio_libs()
 
     # Find the audio directory
     script_dir = Path(__file__).parent
@@ -95,59 +242,74 @@ def main():
     print(f"📄 Output format: 16-bit stereo PCM at original sample rate")
     print()
 
-    # Find all .wav files
-    wav_files = find_wav_files(audio_dir)
-    print(f"Found {len(wav_files)} WAV files")
-    
-    if not wav_files:
+    # Stream the walk straight into the header scan: paths are analyzed in
+    # bounded batches as they are discovered, so the scan starts before the
+    # walk finishes and no full path list is materialized up front. Only
+    # the (usually small) mono subset is retained for conversion.
+    mono_files = []
+    total_files = 0
+    print("📊 Analyzing audio files...")
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        paths = find_wav_files(audio_dir)
+        while True:
+            batch = list(itertools.islice(paths, SCAN_BATCH))
+            if not batch:
+                break
+            for wav_file, (channels, _sample_rate) in zip(batch, pool.map(wav_info, batch)):
+                total_files += 1
+                rel_path = os.path.relpath(wav_file, audio_dir)
+                if channels == 1:
+                    mono_files.append(wav_file)
+                    print(f"  📻 MONO: {rel_path}")
+                else:
+                    print(f"  🎧 STEREO: {rel_path}")
+
+    if not total_files:
         print("No WAV files found!")
         return
-    
-    # Check which files are mono
-    mono_files = []
-    print("\n📊 Analyzing audio files...")
-    for wav_file in wav_files:
-        rel_path = os.path.relpath(wav_file, audio_dir)
-        if is_mono(wav_file):
-            mono_files.append(wav_file)
-            print(f"  📻 MONO: {rel_path}")
-        else:
-            print(f"  🎧 STEREO: {rel_path}")
-    
+
     print(f"\n📈 Summary:")
-    print(f"  Total files: {len(wav_files)}")
+    print(f"  Total files: {total_files}")
     print(f"  Mono files: {len(mono_files)}")
-    print(f"  Stereo files: {len(wav_files) - len(mono_files)}")
-    
+    print(f"  Stereo files: {total_files - len(mono_files)}")
+
     if not mono_files:
         print("\n🎉 All files are already stereo!")
-        # Still offer to convert all WAV to PCM
+        # Still offer to convert all WAV to PCM (re-walked lazily)
         if input("Convert all WAV files to PCM format? (y/N): ").lower().startswith('y'):
-            wav_files_to_convert = wav_files
+            wav_files_to_convert = find_wav_files(audio_dir)
+            convert_total = total_files
         else:
             print("No conversion performed.")
             return
     else:
         wav_files_to_convert = mono_files
-    
+        convert_total = len(mono_files)
+
     if args.dry_run:
-        print(f"\n🔍 DRY RUN: Would convert {len(wav_files_to_convert)} files to stereo PCM")
+        print(f"\n🔍 DRY RUN: Would convert {convert_total} files to stereo PCM")
         return
-    
-    # Convert files to stereo PCM
-    print(f"\n🔄 Converting {len(wav_files_to_convert)} files to stereo PCM...")
+
+    # Convert files to stereo PCM. Each file is independent, so fan the
+    # batch out across cores with worker processes for near-linear speedup
+    max_workers = os.cpu_count() or 1
+    print(f"\n🔄 Converting {convert_total} files to stereo PCM "
+          f"({max_workers} workers)...")
     converted_count = 0
-    
-    for i, audio_file in enumerate(wav_files_to_convert, 1):
-        rel_path = os.path.relpath(audio_file, audio_dir)
-        print(f"[{i}/{len(wav_files_to_convert)}] {rel_path}")
-        
-        if convert_to_stereo(audio_file, backup=not args.no_backup):
-            converted_count += 1
-    
+
+    convert = partial(convert_to_stereo, backup=not args.no_backup)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        wav_files_to_convert, paths_for_progress = itertools.tee(wav_files_to_convert)
+        results = executor.map(convert, wav_files_to_convert, chunksize=4)
+        for i, (audio_file, ok) in enumerate(zip(paths_for_progress, results), 1):
+            rel_path = os.path.relpath(audio_file, audio_dir)
+            print(f"[{i}/{convert_total}] {rel_path}")
+            if ok:
+                converted_count += 1
+
     print(f"\n🎉 Conversion complete!")
     print(f"  ✓ Converted: {converted_count} files")
-    print(f"  ✗ Failed: {len(wav_files_to_convert) - converted_count} files")
+    print(f"  ✗ Failed: {convert_total - converted_count} files")
     print(f"  📄 All files converted to 16-bit stereo PCM format at original sample rate")
     
     if not args.no_backup:
@@ -161,10 +323,9 @@ if __name__ == "__main__":
         print("\n\n⚠️ Conversion interrupted by user")
         sys.exit(1)
     except ImportError as e:
-        if "pydub" in str(e):
-            print("❌ Error: pydub library not found")
-            print("Install it with: pip install pydub")
-            print("You may also need: brew install ffmpeg (on macOS)")
+        if "soundfile" in str(e):
+            print("❌ Error: soundfile library not found")
+            print("Install it with: pip install soundfile numpy")
         else:
             print(f"❌ Import error: {e}")
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
\ No newline at end of file
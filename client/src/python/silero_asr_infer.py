@@ -3,6 +3,10 @@ import argparse
 import requests
 import sys
 
+# Shared session so repeated invocations within one process reuse the
+# TCP connection instead of re-handshaking per request
+SESSION = requests.Session()
+
 def main():
     parser = argparse.ArgumentParser(
         description="Send a WAV file to the Silero ASR server and print the transcription."
@@ -20,9 +24,9 @@ def main():
 
     url = f"http://{args.host}:{args.port}/asr"
     try:
+        # Stream the raw WAV body from disk; no multipart encoder copy
         with open(args.audio, "rb") as f:
-            files = {"audio": (args.audio, f, "audio/wav")}
-            resp = requests.post(url, files=files)
+            resp = SESSION.post(url, data=f, headers={"Content-Type": "audio/wav"})
     except FileNotFoundError:
         print(f"Error: cannot open file {args.audio}", file=sys.stderr)
         sys.exit(1)
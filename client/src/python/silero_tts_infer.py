@@ -1,8 +1,178 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
+import json
+import os
+import sys
 
-import soundfile as sf
-import torch
+# torch and soundfile are imported lazily in main(); paying their multi-
+# hundred-ms import cost before argparse makes --help and usage errors
+# needlessly slow when the extension shells out to this script
+np = None
+sf = None
+torch = None
+f2i16 = None
+
+
+def import_runtime():
+    """Import the heavy runtime dependencies once argparse has succeeded."""
+    global np, sf, torch, f2i16
+    import numpy
+    import soundfile
+    import torch as torch_mod
+    np = numpy
+    sf = soundfile
+    torch = torch_mod
+    torch.set_float32_matmul_precision("high")
+
+    # Optional: numba-compiled FP32->int16 quantizer. LLVM auto-vectorizes
+    # the clamp+scale loop into SIMD pack instructions; cache=True keeps
+    # the compiled kernel across CLI invocations. Falls back to the torch
+    # path when numba isn't installed.
+    try:
+        from numba import njit
+
+        @njit(cache=True, fastmath=True)
+        def quantize_i16(x, out):
+            for i in range(x.size):
+                v = x[i] * 32767.0
+                if v < -32768.0:
+                    out[i] = -32768
+                elif v > 32767.0:
+                    out[i] = 32767
+                else:
+                    out[i] = int(v)
+
+        f2i16 = quantize_i16
+    except ImportError:
+        f2i16 = None
+
+
+def model_cache_path(language, model_id):
+    """Pinned TorchScript checkpoint location for a language/model pair."""
+    cache_dir = os.environ.get("LIPCODER_SILERO_CACHE") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "models"
+    )
+    return os.path.join(cache_dir, f"silero_{language}_{model_id}.pt")
+
+
+def load_model(language, model_id, device):
+    """Load the Silero TTS model once, preferring the pinned local cache.
+
+    torch.hub.load re-validates its cache (git metadata, manifest) on
+    every call; after the first run we keep the TorchScript module as a
+    plain .pt and torch.jit.load it directly, which also lets the kernel
+    page weights in on demand instead of re-reading them up front.
+    """
+    cache_path = model_cache_path(language, model_id)
+    if os.path.exists(cache_path):
+        print(f"[silero_tts_infer] Loading cached Silero {model_id} from {cache_path}…")
+        silero_model = torch.jit.load(cache_path, map_location=device)
+        silero_model.eval()
+        return silero_model
+
+    print(f"[silero_tts_infer] Loading Silero {model_id} on {device}…")
+    hub_return = torch.hub.load(
+        repo_or_dir="snakers4/silero-models",
+        model="silero_tts",
+        language=language,
+        speaker=model_id,
+        device=str(device),
+        jit=True,  # TorchScript variant: fused ops, no Python-level forward
+    )
+
+    if not (isinstance(hub_return, tuple) and len(hub_return) >= 2):
+        raise RuntimeError(
+            f"Unexpected return from torch.hub.load for '{model_id}': {hub_return!r}\n"
+            "Expected at least two items: (model, example_text)."
+        )
+
+    silero_model, _ = hub_return[0], hub_return[1]
+    silero_model.to(device)
+    silero_model.eval()
+
+    # Pin the scripted module locally so later runs skip torch.hub entirely
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        torch.jit.save(silero_model, cache_path)
+        print(f"[silero_tts_infer] Cached model to {cache_path}")
+    except Exception as e:
+        print(f"[silero_tts_infer] Could not cache model ({e}); continuing without")
+    return silero_model
+
+
+def resolve_speaker(silero_model, speaker):
+    """Pick or validate a pseudo-speaker for multi-speaker models."""
+    all_speakers = getattr(silero_model, "speakers", None)
+    if all_speakers:
+        print(f"  • Available pseudo-speakers: {all_speakers}")
+        if speaker is None:
+            chosen_speaker = all_speakers[0]
+            print(f"  • No --speaker passed; defaulting to '{chosen_speaker}'")
+        elif speaker not in all_speakers:
+            raise ValueError(
+                f"Speaker '{speaker}' not in {all_speakers}. "
+                "Use one of the exact names listed above."
+            )
+        else:
+            chosen_speaker = speaker
+    else:
+        chosen_speaker = speaker  # likely None for single‐speaker models
+    return chosen_speaker
+
+
+def synthesize(silero_model, text, speaker, sample_rate, output, device=None):
+    """Run one TTS inference and write the result to a WAV file."""
+    if device is not None and device.type == "cuda":
+        # bf16 halves memory traffic on the vocoder's weight loads
+        autocast = torch.autocast(device_type="cuda", dtype=torch.bfloat16)
+    else:
+        autocast = contextlib.nullcontext()
+    with torch.inference_mode(), autocast:
+        waveform: torch.Tensor = silero_model.apply_tts(
+            text=text,
+            speaker=speaker,
+            sample_rate=sample_rate,
+        )
+    # Quantize to int16 before handing samples to libsndfile — half the
+    # bytes of the FP32 path and no internal format-conversion pass
+    if f2i16 is not None:
+        samples = waveform.cpu().numpy().ravel()
+        pcm = np.empty(samples.size, dtype=np.int16)
+        f2i16(samples, pcm)
+    else:
+        pcm = (waveform.clamp_(-1, 1) * 32767).to(torch.int16).cpu().numpy()
+    sf.write(output, pcm, sample_rate, subtype="PCM_16")
+
+
+def serve(silero_model, default_speaker, default_sample_rate, device=None):
+    """Long-lived worker loop: one JSON request per stdin line.
+
+    Each request looks like {"text": ..., "output": ..., "speaker"?: ...,
+    "sample_rate"?: ...}. The model stays resident, so per-utterance cost
+    is just inference instead of a full torch.hub load per CLI call. The
+    caller keeps this process open and reads one status line per request.
+    """
+    print("[silero_tts_infer] Ready (serve mode)", flush=True)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+            speaker = resolve_speaker(silero_model, req.get("speaker", default_speaker))
+            synthesize(
+                silero_model,
+                req["text"],
+                speaker,
+                int(req.get("sample_rate", default_sample_rate)),
+                req["output"],
+                device=device,
+            )
+            sys.stdout.write("ok\n")
+        except Exception as e:
+            sys.stdout.write(f"error {e}\n")
+        sys.stdout.flush()
 
 
 def main():
@@ -36,13 +206,13 @@ def main():
     parser.add_argument(
         "--text",
         type=str,
-        required=True,
+        default=None,
         help='The UTF-8 text to synthesize, e.g. "Hello, world!"',
     )
     parser.add_argument(
         "--output",
         type=str,
-        required=True,
+        default=None,
         help="Path to write the output WAV file (e.g. ./out.wav)",
     )
     parser.add_argument(
@@ -57,68 +227,67 @@ def main():
         default="cpu",
         help="Torch device to run on (e.g. 'cpu' or 'cuda').",
     )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help=(
+            "Dynamically quantize Linear/LSTM layers to int8 on CPU. "
+            "Roughly halves weight memory traffic; A/B-test quality first."
+        ),
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help=(
+            "Keep the model loaded and synthesize one JSON request per stdin "
+            "line instead of exiting after a single utterance."
+        ),
+    )
     args = parser.parse_args()
 
+    if not args.serve and (args.text is None or args.output is None):
+        parser.error("--text and --output are required unless --serve is given")
+
+    import_runtime()
+
     # 1) Determine device
     if args.device.startswith("cuda") and torch.cuda.is_available():
         device = torch.device(args.device)
     else:
         device = torch.device("cpu")
     torch.set_num_threads(4)
+    # One inter-op thread: with 4 intra-op threads already claimed, more
+    # inter-op parallelism just oversubscribes the cores
+    torch.set_num_interop_threads(1)
 
-    # 2) Load Silero TTS from Torch Hub
-    print(f"[silero_tts_infer] Loading Silero {args.model_id} on {device}…")
-    hub_return = torch.hub.load(
-        repo_or_dir="snakers4/silero-models",
-        model="silero_tts",
-        language=args.language,
-        speaker=args.model_id,
-        device=str(device),
-        jit=False,  # get the Python version (not TorchScript)
-    )
-
-    if not (isinstance(hub_return, tuple) and len(hub_return) >= 2):
-        raise RuntimeError(
-            f"Unexpected return from torch.hub.load for '{args.model_id}': {hub_return!r}\n"
-            "Expected at least two items: (model, example_text)."
-        )
-
-    silero_model, _ = hub_return[0], hub_return[1]
-
-    # 3) If multi-speaker model, pick or validate `--speaker`
-    all_speakers = getattr(silero_model, "speakers", None)
-    if all_speakers:
-        print(f"  • Available pseudo-speakers: {all_speakers}")
-        if args.speaker is None:
-            chosen_speaker = all_speakers[0]
-            print(f"  • No --speaker passed; defaulting to '{chosen_speaker}'")
-        elif args.speaker not in all_speakers:
-            raise ValueError(
-                f"Speaker '{args.speaker}' not in {all_speakers}. "
-                "Use one of the exact names listed above."
+    # 2) Load Silero TTS from Torch Hub (once per process)
+    silero_model = load_model(args.language, args.model_id, device)
+    if args.quantize and device.type == "cpu":
+        # load_model returns the TorchScript variant, which
+        # quantize_dynamic can't rewrite (it swaps eager submodules);
+        # keep the fp32 model rather than crashing in that case
+        try:
+            silero_model = torch.quantization.quantize_dynamic(
+                silero_model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8
             )
-        else:
-            chosen_speaker = args.speaker
-    else:
-        chosen_speaker = args.speaker  # likely None for single‐speaker models
+            print("[silero_tts_infer] Applied int8 dynamic quantization")
+        except Exception as e:
+            print(f"[silero_tts_infer] int8 quantization failed, keeping fp32 model: {e}")
 
-    silero_model.to(device)
-    # silero_model.eval()
+    # 3) Serve mode: amortize the model load over many utterances
+    if args.serve:
+        serve(silero_model, args.speaker, args.sample_rate, device)
+        return
+
+    # 4) One-shot mode: pick speaker, synthesize, save
+    chosen_speaker = resolve_speaker(silero_model, args.speaker)
 
-    # 4) Synthesize
     print(
         f'[silero_tts_infer] Synthesizing ▶ "{args.text}" '
         f"(model={args.model_id}, speaker={chosen_speaker}, sr={args.sample_rate})"
     )
-    with torch.no_grad():
-        waveform: torch.Tensor = silero_model.apply_tts(
-            text=args.text,
-            speaker=chosen_speaker,
-            sample_rate=args.sample_rate,
-        )
-
-    # 5) Save as WAV
-    sf.write(args.output, waveform.cpu().numpy(), args.sample_rate)
+    synthesize(silero_model, args.text, chosen_speaker, args.sample_rate, args.output,
+               device=device)
     print(f"[silero_tts_infer] ✔ Saved synthesized audio to: {args.output}")
 
 
@@ -3,21 +3,123 @@
 Debug XTTS synthesis to find why it's producing gibberish
 """
 
+import io
 import requests
 import json
 import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Shared session so all test cases reuse one TCP connection pool
+SESSION = requests.Session()
+
+def run_test_case(server_url, index, test):
+    """Run one synthesis test against both endpoints, return its report."""
+    lines = [
+        f"\n{index}. Testing: '{test['text']}' ({test['description']})",
+        f"   Language: {test['language']}, Category: {test['category']}",
+    ]
+    payload = {
+        "text": test['text'],
+        "language": test['language'],
+        "category": test['category'],
+        "sample_rate": 24000
+    }
+
+    # Test with fast endpoint first
+    try:
+        start_time = time.time()
+        response = SESSION.post(f"{server_url}/tts_fast", json=payload, timeout=30)
+        elapsed = time.time() - start_time
+
+        if response.status_code == 200:
+            audio_size = len(response.content)
+            lines.append(f"   ✅ Fast endpoint: SUCCESS ({audio_size} bytes, {elapsed:.2f}s)")
+
+            # Save audio for manual inspection
+            filename = f"debug_{test['language']}_{test['category']}_{test['text']}.wav"
+            Path(filename).write_bytes(response.content)
+            lines.append(f"   💾 Saved audio: {filename}")
+
+        else:
+            lines.append(f"   ❌ Fast endpoint: FAILED ({response.status_code})")
+            try:
+                error_data = response.json()
+                lines.append(f"      Error: {error_data.get('error', 'Unknown')}")
+            except:
+                lines.append(f"      Raw response: {response.text[:200]}")
+
+    except Exception as e:
+        lines.append(f"   ❌ Fast endpoint: EXCEPTION - {e}")
+
+    # Also test regular endpoint for comparison
+    try:
+        start_time = time.time()
+        response = SESSION.post(f"{server_url}/tts", json=payload, timeout=30)
+        elapsed = time.time() - start_time
+
+        if response.status_code == 200:
+            audio_size = len(response.content)
+            lines.append(f"   ✅ Regular endpoint: SUCCESS ({audio_size} bytes, {elapsed:.2f}s)")
+        else:
+            lines.append(f"   ❌ Regular endpoint: FAILED ({response.status_code})")
+
+    except Exception as e:
+        lines.append(f"   ❌ Regular endpoint: EXCEPTION - {e}")
+
+    return "\n".join(lines)
+
+def run_batch(server_url, test_cases):
+    """Send all test cases in one /tts_batch request and unzip the WAVs.
+
+    One TCP round-trip for the whole set, and the server keeps the model
+    hot across items. Returns False if the server doesn't support the
+    batch endpoint so the caller can fall back to per-case requests.
+    """
+    items = [
+        {
+            "text": test['text'],
+            "language": test['language'],
+            "category": test['category'],
+            "sample_rate": 24000
+        }
+        for test in test_cases
+    ]
+    try:
+        start_time = time.time()
+        response = SESSION.post(f"{server_url}/tts_batch", json={"items": items}, timeout=60)
+        elapsed = time.time() - start_time
+    except Exception as e:
+        print(f"❌ Batch endpoint: EXCEPTION - {e}")
+        return False
+
+    if response.status_code == 404:
+        print("ℹ️ Server has no /tts_batch endpoint, falling back to per-case requests")
+        return False
+    if response.status_code != 200:
+        print(f"❌ Batch endpoint: FAILED ({response.status_code})")
+        return False
+
+    print(f"✅ Batch endpoint: SUCCESS ({len(response.content)} bytes, {elapsed:.2f}s)")
+    with zipfile.ZipFile(io.BytesIO(response.content)) as bundle:
+        for name in bundle.namelist():
+            filename = f"debug_batch_{name}"
+            Path(filename).write_bytes(bundle.read(name))
+            print(f"   💾 Saved audio: {filename}")
+    return True
 
 def test_xtts_synthesis():
     """Test XTTS synthesis with detailed logging"""
-    
+
     server_url = "http://localhost:5006"
-    
+
     print("🔍 Debugging XTTS Synthesis")
     print("=" * 50)
-    
+
     # Check server health first
     try:
-        health = requests.get(f"{server_url}/health", timeout=5)
+        health = SESSION.get(f"{server_url}/health", timeout=5)
         if health.status_code == 200:
             health_data = health.json()
             print("✅ Server is running")
@@ -31,19 +133,19 @@ def test_xtts_synthesis():
     except Exception as e:
         print(f"❌ Cannot connect to server: {e}")
         return
-    
+
     # Test cases with different complexity
     test_cases = [
         {
             "text": "hello",
-            "language": "en", 
+            "language": "en",
             "category": "variable",
             "description": "Simple English word"
         },
         {
             "text": "function",
             "language": "en",
-            "category": "keyword", 
+            "category": "keyword",
             "description": "Programming keyword"
         },
         {
@@ -53,82 +155,29 @@ def test_xtts_synthesis():
             "description": "Simple Korean word"
         }
     ]
-    
+
     print(f"\n🧪 Testing {len(test_cases)} synthesis cases...")
     print("Watch the server console for detailed logs!")
     print("-" * 50)
-    
-    for i, test in enumerate(test_cases, 1):
-        print(f"\n{i}. Testing: '{test['text']}' ({test['description']})")
-        print(f"   Language: {test['language']}, Category: {test['category']}")
-        
-        # Test with fast endpoint first
-        try:
-            start_time = time.time()
-            
-            response = requests.post(f"{server_url}/tts_fast", 
-                json={
-                    "text": test['text'],
-                    "language": test['language'],
-                    "category": test['category'],
-                    "sample_rate": 24000
-                },
-                timeout=30
-            )
-            
-            elapsed = time.time() - start_time
-            
-            if response.status_code == 200:
-                audio_size = len(response.content)
-                print(f"   ✅ Fast endpoint: SUCCESS ({audio_size} bytes, {elapsed:.2f}s)")
-                
-                # Save audio for manual inspection
-                filename = f"debug_{test['language']}_{test['category']}_{test['text']}.wav"
-                with open(filename, 'wb') as f:
-                    f.write(response.content)
-                print(f"   💾 Saved audio: {filename}")
-                
-            else:
-                print(f"   ❌ Fast endpoint: FAILED ({response.status_code})")
-                try:
-                    error_data = response.json()
-                    print(f"      Error: {error_data.get('error', 'Unknown')}")
-                except:
-                    print(f"      Raw response: {response.text[:200]}")
-        
-        except Exception as e:
-            print(f"   ❌ Fast endpoint: EXCEPTION - {e}")
-        
-        # Also test regular endpoint for comparison
-        try:
-            start_time = time.time()
-            
-            response = requests.post(f"{server_url}/tts", 
-                json={
-                    "text": test['text'],
-                    "language": test['language'],
-                    "category": test['category'],
-                    "sample_rate": 24000
-                },
-                timeout=30
-            )
-            
-            elapsed = time.time() - start_time
-            
-            if response.status_code == 200:
-                audio_size = len(response.content)
-                print(f"   ✅ Regular endpoint: SUCCESS ({audio_size} bytes, {elapsed:.2f}s)")
-            else:
-                print(f"   ❌ Regular endpoint: FAILED ({response.status_code})")
-        
-        except Exception as e:
-            print(f"   ❌ Regular endpoint: EXCEPTION - {e}")
-    
+
+    # Prefer one batched request for the whole set; fall back to
+    # concurrent per-case requests if the server doesn't support it
+    if not run_batch(server_url, test_cases):
+        # Fire all cases at once so network, server-side synthesis, and
+        # disk writes overlap instead of serializing per test case
+        with ThreadPoolExecutor(max_workers=len(test_cases)) as executor:
+            futures = [
+                executor.submit(run_test_case, server_url, i, test)
+                for i, test in enumerate(test_cases, 1)
+            ]
+            for future in as_completed(futures):
+                print(future.result())
+
     print("\n" + "=" * 50)
     print("🔍 Check the XTTS server console for detailed debug logs!")
     print("Look for these log patterns:")
     print("  - '[DEBUG] Language detection details'")
-    print("  - '[DEBUG] TTS synthesis completed'") 
+    print("  - '[DEBUG] TTS synthesis completed'")
     print("  - '[DEBUG] Fast synthesis used language'")
     print("  - Any error messages or warnings")
     print("\n💡 If audio files sound like gibberish:")
@@ -11,6 +11,11 @@ import sys
 import re
 from pathlib import Path
 
+# Hardcoded-path patterns, compiled once at import and in bytes form so
+# they apply straight to raw file contents without a decode pass
+SHEBANG_RE = re.compile(rb'^#!/Users/[^/]+/Desktop/lipcoder/(.*)$')
+VENV_RE = re.compile(rb'VIRTUAL_ENV=/Users/[^/]+/Desktop/lipcoder/(.*)')
+
 def fix_python_paths(venv_dir):
     """Fix hardcoded Python paths in virtual environment scripts"""
     
@@ -27,47 +32,57 @@ def fix_python_paths(venv_dir):
         print(f"Bin directory not found: {bin_dir}")
         return False
     
-    # Pattern to match shebang lines with hardcoded paths
-    shebang_pattern = re.compile(r'^#!/Users/[^/]+/Desktop/lipcoder/(.*)$')
-    
     fixed_count = 0
     
-    # Process all files in bin directory
-    for file_path in bin_dir.iterdir():
-        if file_path.is_file():
+    # Process all files in bin directory. scandir hands back the file type
+    # from the directory entry itself, so no extra stat() per file
+    with os.scandir(bin_dir) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
             try:
-                # Read the file
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    lines = f.readlines()
-                
-                if not lines:
+                # Peek at the head only: most bin/ entries are binaries or
+                # scripts without the hardcoded shebang, so they can be
+                # skipped without buffering (and rewriting) the whole file
+                with open(entry.path, 'rb') as f:
+                    head = f.read(256)
+
+                # Literal-prefix gate: almost nothing in bin/ starts with
+                # a hardcoded shebang, so a memcmp settles the common
+                # negative case before the regex engine is ever invoked
+                if not head.startswith(b'#!/Users/'):
                     continue
-                
-                # Check if first line is a shebang with hardcoded path
-                first_line = lines[0].strip()
-                match = shebang_pattern.match(first_line)
-                
+
+                # Check if first line is a shebang with hardcoded path;
+                # the bytes pattern matches the raw head, so only matched
+                # groups ever get decoded
+                newline_pos = head.find(b'\n')
+                first_line_bytes = head[:newline_pos] if newline_pos != -1 else head
+                match = SHEBANG_RE.match(first_line_bytes.strip())
+
                 if match:
+                    first_line = first_line_bytes.decode('utf-8', errors='ignore').strip()
+
                     # Extract the relative path part
-                    relative_path = match.group(1)
-                    
+                    relative_path = match.group(1).decode('utf-8', errors='ignore')
+
                     # Create new shebang with current directory
                     new_shebang = f"#!{current_dir}/{relative_path}"
-                    
-                    # Update the first line
+
+                    # Only a confirmed match pays for the full read/rewrite
+                    with open(entry.path, 'r', encoding='utf-8', errors='ignore') as f:
+                        lines = f.readlines()
                     lines[0] = new_shebang + '\n'
-                    
-                    # Write back to file
-                    with open(file_path, 'w', encoding='utf-8') as f:
+                    with open(entry.path, 'w', encoding='utf-8') as f:
                         f.writelines(lines)
-                    
-                    print(f"Fixed: {file_path.name}")
+
+                    print(f"Fixed: {entry.name}")
                     print(f"  Old: {first_line}")
                     print(f"  New: {new_shebang}")
                     fixed_count += 1
-                    
+
             except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+                print(f"Error processing {entry.path}: {e}")
                 continue
     
     # Also fix activate scripts
@@ -77,27 +92,25 @@ def fix_python_paths(venv_dir):
         bin_dir / "activate.fish"
     ]
     
+    current_dir_bytes = os.fsencode(str(current_dir))
+
     for activate_file in activate_files:
         if activate_file.exists():
             try:
-                with open(activate_file, 'r') as f:
+                with open(activate_file, 'rb') as f:
                     content = f.read()
-                
-                # Pattern to match VIRTUAL_ENV paths
-                venv_pattern = re.compile(r'VIRTUAL_ENV=/Users/[^/]+/Desktop/lipcoder/(.*)')
-                
+
                 def replace_venv_path(match):
-                    relative_path = match.group(1)
-                    return f'VIRTUAL_ENV={current_dir}/{relative_path}'
-                
-                new_content = venv_pattern.sub(replace_venv_path, content)
-                
+                    return b'VIRTUAL_ENV=' + current_dir_bytes + b'/' + match.group(1)
+
+                new_content = VENV_RE.sub(replace_venv_path, content)
+
                 if new_content != content:
-                    with open(activate_file, 'w') as f:
+                    with open(activate_file, 'wb') as f:
                         f.write(new_content)
                     print(f"Fixed activate script: {activate_file.name}")
                     fixed_count += 1
-                    
+
             except Exception as e:
                 print(f"Error processing {activate_file}: {e}")
                 continue
@@ -6,6 +6,7 @@ Convert MOV voice files to 16kHz mono WAV files for XTTS-v2 speaker cloning.
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 def convert_mov_to_wav(input_file, output_file):
@@ -14,6 +15,7 @@ def convert_mov_to_wav(input_file, output_file):
         cmd = [
             'ffmpeg',
             '-i', str(input_file),
+            '-threads', '0', # let ffmpeg use all cores
             '-ar', '16000',  # 16kHz sample rate
             '-ac', '1',      # mono (1 channel)
             '-acodec', 'pcm_s16le',  # 16-bit PCM
@@ -39,6 +41,47 @@ def convert_mov_to_wav(input_file, output_file):
         print(f"❌ Error converting {input_file.name}: {e}")
         return False
 
+def convert_mov_batch(batch):
+    """Convert several MOV files with one ffmpeg invocation.
+
+    All outputs share the same encoder settings, so one process with
+    multiple -i inputs and per-output -map amortizes ffmpeg's startup
+    cost across the batch. Falls back to per-file conversion if the
+    batched run fails, so a single bad input can't sink its batch.
+    Returns the number of files successfully converted.
+    """
+    cmd = ['ffmpeg', '-y', '-threads', '0']
+    for mov_file in batch:
+        cmd += ['-i', str(mov_file)]
+    for index, mov_file in enumerate(batch):
+        cmd += [
+            '-map', f'{index}:a',
+            '-ar', '16000',
+            '-ac', '1',
+            '-acodec', 'pcm_s16le',
+            str(mov_file.with_suffix('.wav')),
+        ]
+
+    try:
+        print(f"Converting batch of {len(batch)} files...")
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0:
+            for mov_file in batch:
+                print(f"✅ Successfully converted {mov_file.name}")
+            return len(batch)
+    except FileNotFoundError:
+        print("❌ ffmpeg not found. Please install ffmpeg:")
+        print("   brew install ffmpeg")
+        return 0
+    except Exception as e:
+        print(f"❌ Error converting batch: {e}")
+
+    print("⚠️ Batched conversion failed, retrying files individually...")
+    return sum(
+        convert_mov_to_wav(mov_file, mov_file.with_suffix('.wav'))
+        for mov_file in batch
+    )
+
 def main():
     # Define paths
     voices_dir = Path(__file__).parent / "voices"
@@ -60,21 +103,29 @@ def main():
     
     print("\nStarting conversion...")
     
+    # Each worker just waits on its ffmpeg process, so threads (not
+    # processes) are enough to keep all cores busy. Files are grouped
+    # into one batch per worker so each ffmpeg is started exactly once
+    num_workers = min(os.cpu_count() or 1, len(mov_files))
+    batches = [mov_files[i::num_workers] for i in range(num_workers)]
+
     success_count = 0
-    for mov_file in mov_files:
-        # Create output filename (same name but .wav extension)
-        wav_file = mov_file.with_suffix('.wav')
-        
-        if convert_mov_to_wav(mov_file, wav_file):
-            success_count += 1
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(convert_mov_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            success_count += future.result()
     
     print(f"\n🎉 Conversion complete: {success_count}/{len(mov_files)} files converted successfully")
     
     if success_count > 0:
         print("\nConverted WAV files:")
-        for wav_file in voices_dir.glob("*.wav"):
-            size_mb = wav_file.stat().st_size / (1024 * 1024)
-            print(f"  - {wav_file.name} ({size_mb:.1f} MB)")
+        # scandir reuses the readdir metadata, so the size report costs one
+        # pass over the directory instead of a glob plus a stat per file
+        with os.scandir(voices_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.wav') and entry.is_file(follow_symlinks=False):
+                    size_mb = entry.stat().st_size / (1024 * 1024)
+                    print(f"  - {entry.name} ({size_mb:.1f} MB)")
 
 if __name__ == "__main__":
     main()
@@ -1,40 +1,278 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
+import collections
+import ctypes
+import queue
+import struct
 import subprocess
-import uuid
+import threading
 import os
-import tempfile
-import shutil
 import logging
+from xml.sax.saxutils import escape
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class ORJSONProvider(DefaultJSONProvider):
+    """C-backed JSON codec for request parsing and jsonify responses."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# libespeak-ng constants (speak_lib.h)
+AUDIO_OUTPUT_RETRIEVAL = 1   # synthesize into the callback, no audio device
+espeakRATE = 1
+espeakVOLUME = 2
+espeakPITCH = 3
+espeakWORDGAP = 7
+espeakCHARS_UTF8 = 1
+
+# In-process synthesis state: libespeak-ng keeps global voice/parameter
+# state and is not thread-safe, so all synth calls serialize on this lock
+_espeak_lib = None
+_espeak_lock = threading.Lock()
+_espeak_sample_rate = 22050
+_espeak_buffer = bytearray()
+_espeak_callback = None  # keep a reference so ctypes doesn't GC it
+
+def _load_espeak_library():
+    """Load libespeak-ng once in retrieval (synth-to-buffer) mode.
+
+    Returns the CDLL handle, or None if the shared library isn't
+    available — the server then falls back to shelling out per request.
+    """
+    global _espeak_sample_rate, _espeak_callback
+    lib = None
+    for name in ('libespeak-ng.dylib', 'libespeak-ng.so.1', 'libespeak-ng.so'):
+        try:
+            lib = ctypes.CDLL(name)
+            break
+        except OSError:
+            continue
+    if lib is None:
+        return None
+
+    try:
+        rate = lib.espeak_Initialize(AUDIO_OUTPUT_RETRIEVAL, 0, None, 0)
+        if rate <= 0:
+            return None
+        _espeak_sample_rate = rate
+
+        callback_type = ctypes.CFUNCTYPE(
+            ctypes.c_int, ctypes.POINTER(ctypes.c_short),
+            ctypes.c_int, ctypes.c_void_p
+        )
+
+        def _collect_samples(wav, numsamples, events):
+            if wav and numsamples > 0:
+                _espeak_buffer.extend(ctypes.string_at(wav, numsamples * 2))
+            return 0  # 0 = continue synthesis
+
+        _espeak_callback = callback_type(_collect_samples)
+        lib.espeak_SetSynthCallback(_espeak_callback)
+        return lib
+    except Exception as e:
+        logger.warning(f"libespeak-ng found but initialization failed: {e}")
+        return None
+
+def espeak_synth_to_wav(text, voice, speed, pitch, amplitude, gap):
+    """Synthesize text in-process and return complete WAV bytes.
+
+    No fork/exec and no tempfile round-trip: the synth callback appends
+    PCM shorts after a 44-byte header placeholder in a single buffer, and
+    the RIFF header is patched in place once the sizes are known — no
+    separate PCM copy and no header+payload concatenation.
+    """
+    global _espeak_buffer
+    with _espeak_lock:
+        # Fresh buffer per request so the result can be handed back
+        # without copying the payload out of a shared scratch buffer
+        _espeak_buffer = bytearray(44)
+        wav_buffer = _espeak_buffer
+        _espeak_lib.espeak_SetVoiceByName(voice.encode('utf-8'))
+        _espeak_lib.espeak_SetParameter(espeakRATE, int(speed), 0)
+        _espeak_lib.espeak_SetParameter(espeakPITCH, int(pitch), 0)
+        _espeak_lib.espeak_SetParameter(espeakVOLUME, int(amplitude), 0)
+        _espeak_lib.espeak_SetParameter(espeakWORDGAP, int(gap), 0)
+        encoded = text.encode('utf-8')
+        _espeak_lib.espeak_Synth(encoded, len(encoded) + 1, 0, 0, 0,
+                                 espeakCHARS_UTF8, None, None)
+        _espeak_lib.espeak_Synchronize()
+
+    struct.pack_into(
+        '<4sI4s4sIHHIIHH4sI', wav_buffer, 0,
+        b'RIFF', len(wav_buffer) - 8, b'WAVE',
+        b'fmt ', 16, 1, 1, _espeak_sample_rate,
+        _espeak_sample_rate * 2, 2, 16,
+        b'data', len(wav_buffer) - 44
+    )
+    return bytes(wav_buffer)
+
+# Synthesized-audio LRU. lipcoder re-speaks the same short tokens (UI
+# labels, keywords, identifiers) constantly, so a hit skips synthesis
+# entirely. Bounded by entry count and total payload bytes.
+CACHE_MAX_ENTRIES = 2048
+CACHE_MAX_BYTES = 64 << 20
+_audio_cache = collections.OrderedDict()
+_audio_cache_bytes = 0
+_audio_cache_lock = threading.Lock()
+
+def _cache_get(key):
+    with _audio_cache_lock:
+        audio_data = _audio_cache.get(key)
+        if audio_data is not None:
+            _audio_cache.move_to_end(key)
+        return audio_data
+
+def _cache_put(key, audio_data):
+    global _audio_cache_bytes
+    with _audio_cache_lock:
+        if key in _audio_cache:
+            return
+        _audio_cache[key] = audio_data
+        _audio_cache_bytes += len(audio_data)
+        while _audio_cache and (len(_audio_cache) > CACHE_MAX_ENTRIES
+                                or _audio_cache_bytes > CACHE_MAX_BYTES):
+            _, evicted = _audio_cache.popitem(last=False)
+            _audio_cache_bytes -= len(evicted)
+
+# Pre-spawned worker pool for the subprocess fallback. espeak-ng only
+# finalizes the RIFF sizes in its --stdout WAV when stdin closes, so each
+# worker serves exactly one request (EOF delimits the audio) and a
+# replacement is spawned on a background thread — fork+exec still happens,
+# but off the request's critical path.
+_WORKER_POOL_SIZE = os.cpu_count() or 1
+_worker_pool = None
+
+def _spawn_espeak_worker(gap=0):
+    cmd = ['espeak-ng', '--stdin', '--stdout', '-m']
+    if gap:
+        cmd += ['-g', str(gap)]
+    return subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        bufsize=1 << 20,
+    )
+
+def _init_worker_pool():
+    global _worker_pool
+    _worker_pool = queue.Queue(maxsize=_WORKER_POOL_SIZE)
+    for _ in range(_WORKER_POOL_SIZE):
+        _worker_pool.put(_spawn_espeak_worker())
+
+def _refill_worker_pool():
+    try:
+        _worker_pool.put_nowait(_spawn_espeak_worker())
+    except queue.Full:
+        pass
+
+def espeak_subprocess_synth(text, voice, speed, pitch, amplitude, gap):
+    """Synthesize via a pre-spawned espeak-ng process and return WAV bytes.
+
+    Workers are spawned generically before any request arrives; voice and
+    prosody travel inline as SSML (-m), so no per-request CLI flags are
+    needed. Word gap has no SSML equivalent, so a nonzero gap spawns a
+    one-off worker with -g instead of drawing from the pool.
+    """
+    if gap:
+        worker = _spawn_espeak_worker(gap)
+    else:
+        worker = _worker_pool.get(timeout=10)
+        threading.Thread(target=_refill_worker_pool, daemon=True).start()
+    # espeak defaults: 175wpm rate, pitch 50 (=100%), amplitude 100 (=100%)
+    ssml = (
+        '<voice name="%s"><prosody rate="%.2f" pitch="%d%%" volume="%d%%">'
+        '%s</prosody></voice>'
+        % (voice, speed / 175.0, int(pitch) * 2, int(amplitude), escape(text))
+    )
+    try:
+        audio_data, _ = worker.communicate(ssml.encode('utf-8'), timeout=10)
+    except subprocess.TimeoutExpired:
+        # subprocess.run killed the child on timeout; do the same here or
+        # every timed-out request leaks a wedged espeak-ng process
+        worker.kill()
+        worker.communicate()
+        raise
+    if worker.returncode != 0:
+        raise RuntimeError(f"espeak-ng worker exited with {worker.returncode}")
+    return audio_data
+
 # Check if espeak-ng is available
 def check_espeak_available():
+    # Only the return code matters, so skip the pipes and the text decode
     try:
-        result = subprocess.run(['espeak-ng', '--version'], 
-                              capture_output=True, text=True, timeout=5)
+        result = subprocess.run(['espeak-ng', '--version'],
+                              stdin=subprocess.DEVNULL,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL,
+                              timeout=5)
         return result.returncode == 0
     except (subprocess.TimeoutExpired, FileNotFoundError):
         return False
 
-# Global check on startup
-ESPEAK_AVAILABLE = check_espeak_available()
-if not ESPEAK_AVAILABLE:
-    logger.error("espeak-ng is not available. Please install it with: brew install espeak-ng")
+# The voice list is static for a given espeak-ng install, so fetch it once
+# at startup and serve /voices from memory instead of forking per request
+VOICES_RAW = None
+
+def _load_voice_list():
+    try:
+        result = subprocess.run(['espeak-ng', '--voices'],
+                              stdin=subprocess.DEVNULL,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL,
+                              text=True, timeout=5)
+        if result.returncode == 0:
+            return result.stdout
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        pass
+    return None
+
+# Global check on startup: prefer the in-process library, fall back to
+# the espeak-ng binary
+_espeak_lib = _load_espeak_library()
+if _espeak_lib is not None:
+    ESPEAK_AVAILABLE = True
+    logger.info(f"libespeak-ng loaded in-process (sample rate: {_espeak_sample_rate}Hz)")
+    VOICES_RAW = _load_voice_list()
 else:
-    logger.info("espeak-ng is available and ready")
+    ESPEAK_AVAILABLE = check_espeak_available()
+    if not ESPEAK_AVAILABLE:
+        logger.error("espeak-ng is not available. Please install it with: brew install espeak-ng")
+    else:
+        _init_worker_pool()
+        VOICES_RAW = _load_voice_list()
+        logger.info(f"espeak-ng binary is available (libespeak-ng not found, "
+                    f"using {_WORKER_POOL_SIZE} pre-spawned workers)")
+
+# Degraded mode short-circuit: with espeak missing every synthesis
+# endpoint fails the same way, so answer from a precomputed response
+# before any request parsing or handler work happens
+_UNAVAILABLE_JSON = '{"error": "espeak-ng is not installed"}'
+
+@app.before_request
+def _fail_fast_without_espeak():
+    if not ESPEAK_AVAILABLE and request.endpoint in ('tts', 'list_voices'):
+        return Response(_UNAVAILABLE_JSON, status=500, mimetype='application/json')
 
 # Flask app for direct use
 
 @app.route('/tts', methods=['POST'])
 def tts():
-    if not ESPEAK_AVAILABLE:
-        return jsonify({'error': 'espeak-ng is not installed'}), 500
-        
     try:
         data = request.json
         text = data['text']
@@ -47,76 +285,45 @@ def tts():
         gap = data.get('gap', 0)        # gap between words in 10ms units
         sample_rate = data.get('sample_rate', 24000)
         
-        # DEBUG: Log the exact voice being requested
-        logger.info(f"🔍 DEBUG TTS request: text='{text}', voice='{voice}', speed={speed}, pitch={pitch}")
-        logger.info(f"🔍 DEBUG Voice type: {type(voice)}, Voice repr: {repr(voice)}")
-        
-        # Create temporary file for output
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_path = temp_file.name
-        
+        # Lazy %-style formatting: when DEBUG is off these cost a level
+        # check instead of an f-string build per request
+        logger.debug("TTS request: text=%r, voice=%r, speed=%s, pitch=%s",
+                     text, voice, speed, pitch)
+
+        # Cache hit: serve the previously synthesized WAV straight away
+        cache_key = (text, voice, speed, pitch, amplitude, gap)
+        cached_audio = _cache_get(cache_key)
+        if cached_audio is not None:
+            return Response(cached_audio, mimetype='audio/wav', direct_passthrough=True)
+
+        # In-process path: synthesize straight into memory via libespeak-ng
+        if _espeak_lib is not None:
+            audio_data = espeak_synth_to_wav(text, voice, speed, pitch, amplitude, gap)
+            if len(audio_data) <= 44:
+                return jsonify({'error': 'No audio output generated'}), 500
+            logger.debug("Generated %d bytes of audio (in-process)", len(audio_data))
+            _cache_put(cache_key, audio_data)
+            return Response(audio_data, mimetype='audio/wav', direct_passthrough=True)
+
+        # Subprocess fallback when only the espeak-ng binary is available:
+        # dispatch to a pre-spawned --stdin/--stdout worker so the fork+exec
+        # cost is paid off the request path
         try:
-            # Build espeak-ng command
-            cmd = [
-                'espeak-ng',
-                '-v', voice,           # voice
-                '-s', str(speed),      # speed (words per minute)
-                '-p', str(pitch),      # pitch (0-99)
-                '-a', str(amplitude),  # amplitude (0-200)
-                '-g', str(gap),        # gap between words
-                '-w', temp_path,       # output to WAV file
-                text                   # text to synthesize
-            ]
-            
-            # DEBUG: Log the exact command being run
-            logger.info(f"🔍 DEBUG espeak command: {' '.join(cmd)}")
-            
-            # Run espeak-ng
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
-            if result.returncode != 0:
-                logger.error(f"🔍 DEBUG espeak-ng stderr: {result.stderr}")
-                logger.error(f"🔍 DEBUG espeak-ng stdout: {result.stdout}")
-                logger.error(f"espeak-ng failed: {result.stderr}")
-                return jsonify({
-                    'error': 'espeak-ng synthesis failed',
-                    'details': result.stderr
-                }), 500
-            
-            # Check if output file was created
-            if not os.path.exists(temp_path):
+            audio_data = espeak_subprocess_synth(text, voice, speed, pitch, amplitude, gap)
+
+            if not audio_data or len(audio_data) <= 44:
                 return jsonify({'error': 'No audio output generated'}), 500
-            
-            # Read the WAV file
-            with open(temp_path, 'rb') as f:
-                audio_data = f.read()
-            
-            # Clean up temporary file
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass  # Ignore cleanup errors
-            
-            logger.info(f"Successfully generated {len(audio_data)} bytes of audio")
-            
+
+            logger.debug("Generated %d bytes of audio (subprocess)", len(audio_data))
+
             # Return audio data as binary response
-            from flask import Response
-            return Response(audio_data, mimetype='audio/wav')
-            
+            _cache_put(cache_key, audio_data)
+            return Response(audio_data, mimetype='audio/wav', direct_passthrough=True)
+
         except subprocess.TimeoutExpired:
-            # Clean up on timeout
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass
             return jsonify({'error': 'espeak-ng timeout'}), 500
-            
+
         except Exception as e:
-            # Clean up on any other error
-            try:
-                os.unlink(temp_path)
-            except OSError:
-                pass
             logger.error(f"Unexpected error: {str(e)}")
             return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
             
@@ -130,29 +337,22 @@ def health():
     return jsonify({
         'status': 'healthy',
         'espeak_available': ESPEAK_AVAILABLE,
+        'in_process': _espeak_lib is not None,
         'service': 'espeak-ng TTS Server'
     })
 
 @app.route('/voices', methods=['GET'])
 def list_voices():
     """List available espeak-ng voices"""
-    if not ESPEAK_AVAILABLE:
-        return jsonify({'error': 'espeak-ng is not installed'}), 500
-    
-    try:
-        result = subprocess.run(['espeak-ng', '--voices'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            return jsonify({
-                'voices': result.stdout,
-                'raw_output': result.stdout.split('\n')
-            })
-        else:
-            return jsonify({'error': 'Failed to list voices'}), 500
-    except Exception as e:
-        return jsonify({'error': f'Error listing voices: {str(e)}'}), 500
+    if VOICES_RAW is None:
+        return jsonify({'error': 'Failed to list voices'}), 500
+    return jsonify({
+        'voices': VOICES_RAW,
+        'raw_output': VOICES_RAW.split('\n')
+    })
 
 if __name__ == '__main__':
+    # Dev fallback only; start_espeak_tts.sh serves via threaded gunicorn
     port = int(os.environ.get('PORT', 5005))
     logger.info(f"Starting espeak-ng TTS server on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,179 @@
+//! Compiled port of filter_hallucinations from huggingface_whisper_server.py.
+//!
+//! The Python version runs dozens of interpreter-level string/dict ops per
+//! ASR response; this does the same work in a few linear passes. Semantics
+//! mirror the Python fallback — keep the two in sync when thresholds or the
+//! phrase list change.
+
+use std::collections::{HashMap, HashSet};
+
+use aho_corasick::AhoCorasick;
+use once_cell::sync::Lazy;
+use pyo3::prelude::*;
+
+/// Mirror of HALLUCINATION_PHRASES in huggingface_whisper_server.py.
+const HALLUCINATION_PHRASES: &[&str] = &[
+    // Korean common hallucinations
+    "자막은 설정에서 선택하실 수 있습니다",
+    "구독과 좋아요 부탁드립니다",
+    "시청해주셔서 감사합니다",
+    "다음 영상에서 만나요",
+    "좋아요와 구독 부탁드려요",
+    "구독 좋아요 부탁드립니다",
+    "자막은 설정에서 선택하실수있습니다",
+    "자막은 설정에서 선택하실 수가 있습니다",
+    "시청해 주셔서 감사합니다",
+    "감사합니다",
+    "안녕하세요",
+    "여러분 안녕하세요",
+    // English common hallucinations
+    "Thank you for watching",
+    "Please like and subscribe",
+    "Don't forget to hit the bell",
+    "See you in the next video",
+    "Thanks for your attention",
+    "Please subscribe to my channel",
+    "Please subscribe and like",
+    "Subscribe and like",
+    "Thanks for watching",
+    "Don't forget to subscribe",
+    "Hit the subscribe button",
+    "Subtitles by",
+    "Captions by",
+    // Generic patterns
+    "음악",
+    "박수",
+    "웃음",
+    "Music",
+    "Applause",
+    "Laughter",
+    "[음악]",
+    "[박수]",
+    "[웃음]",
+    "[Music]",
+    "[Applause]",
+    "[Laughter]",
+];
+
+static AUTOMATON: Lazy<AhoCorasick> = Lazy::new(|| {
+    let patterns: Vec<String> = HALLUCINATION_PHRASES
+        .iter()
+        .map(|p| p.to_lowercase())
+        .collect();
+    AhoCorasick::new(patterns).expect("hallucination phrase automaton")
+});
+
+fn long_word(word: &str) -> bool {
+    word.chars().count() >= 3
+}
+
+/// Filter common Whisper hallucinations from `text`.
+///
+/// Returns the cleaned text, or an empty string when the whole response
+/// looks hallucinated.
+#[pyfunction]
+fn filter(text: &str) -> String {
+    let text = text.trim();
+    if text.is_empty() {
+        return String::new();
+    }
+
+    // 1. Common phrase filtering: one Aho-Corasick pass over the
+    //    lowercased text covers every phrase at once
+    if AUTOMATON.is_match(text.to_lowercase().as_str()) {
+        return String::new();
+    }
+
+    // 2. Length-based filtering (code points, matching Python's len())
+    let n_chars = text.chars().count();
+    if !(2..=1000).contains(&n_chars) {
+        return String::new();
+    }
+
+    let mut text = text.to_string();
+    let mut words: Vec<String> = text.split_whitespace().map(str::to_string).collect();
+
+    // 3. Word-level repetition: when one long word dominates, keep the
+    //    first occurrence of each long word instead of dropping the text
+    if words.len() > 1 {
+        let mut counts: HashMap<&str, usize> = HashMap::new();
+        for word in &words {
+            if long_word(word) {
+                *counts.entry(word.as_str()).or_insert(0) += 1;
+            }
+        }
+        let total: usize = counts.values().sum();
+        if total > 0 {
+            let max_repetitions = counts.values().copied().max().unwrap_or(0);
+            if max_repetitions as f64 / total as f64 > 0.6 {
+                let mut seen: HashSet<String> = HashSet::new();
+                let mut unique: Vec<String> = Vec::with_capacity(words.len());
+                for word in &words {
+                    if !long_word(word) || !seen.contains(word) {
+                        unique.push(word.clone());
+                        if long_word(word) {
+                            seen.insert(word.clone());
+                        }
+                    }
+                }
+                text = unique.join(" ");
+                words = unique;
+            }
+        }
+    }
+
+    // 4 + 5. Character repetition and special-character stats in a
+    //        single UTF-8 pass over the (possibly rewritten) text
+    let mut char_counts: HashMap<char, usize> = HashMap::new();
+    let mut n_total = 0usize;
+    let mut n_non_ws = 0usize;
+    let mut n_special = 0usize;
+    for c in text.chars() {
+        n_total += 1;
+        let is_ws = c == ' ' || ('\u{9}'..='\u{d}').contains(&c);
+        if !is_ws {
+            n_non_ws += 1;
+            *char_counts.entry(c).or_insert(0) += 1;
+        }
+        let is_alnum = c.is_ascii_alphanumeric();
+        let is_hangul = ('\u{ac00}'..='\u{d7a3}').contains(&c);
+        if !(is_alnum || is_hangul || is_ws) {
+            n_special += 1;
+        }
+    }
+    if n_non_ws > 0 {
+        let max_char_repetitions = char_counts.values().copied().max().unwrap_or(0);
+        let ratio = max_char_repetitions as f64 / n_non_ws as f64;
+        if ratio > 0.9 && n_total < 10 {
+            return String::new();
+        }
+    }
+    if n_total > 0 && n_special as f64 / n_total as f64 > 0.5 {
+        return String::new();
+    }
+
+    // 6. Consecutive repetition: collapse runs of the same word to one
+    if words.len() >= 3 {
+        let mut cleaned: Vec<&str> = Vec::with_capacity(words.len());
+        let mut i = 0;
+        while i < words.len() {
+            cleaned.push(words[i].as_str());
+            let mut j = i + 1;
+            while j < words.len() && words[j] == words[i] {
+                j += 1;
+            }
+            i = j;
+        }
+        if cleaned.len() != words.len() {
+            text = cleaned.join(" ");
+        }
+    }
+
+    text
+}
+
+#[pymodule]
+fn filter_hallucinations_rs(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_function(wrap_pyfunction!(filter, m)?)?;
+    Ok(())
+}
@@ -4,21 +4,28 @@ Hugging Face Whisper ASR Server
 Local Whisper model using Hugging Face Transformers for speech recognition
 """
 
+import io
 import os
 import sys
+import time
+import queue
 import logging
-import tempfile
+import threading
 import traceback
 import re
+from collections import Counter
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
-import torch
-import torchaudio
 from flask import Flask, request, jsonify
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
 import numpy as np
 
+# torch / torchaudio / transformers cost seconds of import time; they are
+# imported inside the functions that need them (Python caches modules, so
+# only the first use pays) so the Flask app is defined — and /health
+# answers — as soon as the process is up.
+
 # Set up Hugging Face cache directory within the project
 script_dir = os.path.dirname(os.path.abspath(__file__))
 hf_cache_dir = os.path.join(script_dir, 'models', 'huggingface_cache')
@@ -42,24 +49,66 @@ app = Flask(__name__)
 
 # Global variables
 whisper_pipeline = None
+whisper_backend = None
 device = None
 torch_dtype = None
 
 def setup_whisper_model():
-    """Initialize Hugging Face Whisper model"""
-    global whisper_pipeline, device, torch_dtype
-    
+    """Initialize the Whisper model.
+
+    Prefers faster-whisper (CTranslate2) with int8 weights — the decoder
+    is memory-bound on its matmuls, so weight-only quantization plus the
+    fused C++ beam search cuts per-request latency severalfold. Falls
+    back to the Hugging Face pipeline when faster-whisper isn't
+    installed.
+    """
+    global whisper_pipeline, whisper_backend, device, torch_dtype
+
+    import torch
+    from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+
+    # Preferred backend: CTranslate2 runs the decoder loop in C++ with
+    # int8 weights, which is where the HF pipeline spends most of its time
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError:
+        WhisperModel = None
+
+    # Inference-only process: nothing here ever backpropagates, so disable
+    # autograd globally and let intra-op parallelism use every core
+    torch.set_grad_enabled(False)
+    torch.set_num_threads(os.cpu_count() or 1)
+
     try:
         # Determine device and dtype
         device = "cuda:0" if torch.cuda.is_available() else "cpu"
         torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
-        
+
         logger.info(f"🤖 Using device: {device}")
         logger.info(f"🔢 Using dtype: {torch_dtype}")
-        
+
+        if WhisperModel is not None:
+            try:
+                ct2_device = "cuda" if torch.cuda.is_available() else "cpu"
+                compute_type = "int8_float16" if ct2_device == "cuda" else "int8"
+                logger.info(f"📥 Loading faster-whisper 'small' ({compute_type}) on {ct2_device}")
+                whisper_pipeline = WhisperModel(
+                    "small",
+                    device=ct2_device,
+                    compute_type=compute_type,
+                    num_workers=1,
+                    cpu_threads=os.cpu_count() or 1,
+                    download_root=hf_cache_dir,
+                )
+                whisper_backend = 'faster-whisper'
+                logger.info("✅ faster-whisper model loaded successfully")
+                return True
+            except Exception as fw_error:
+                logger.warning(f"⚠️ faster-whisper load failed, falling back to transformers: {fw_error}")
+
         # Model configuration (using smaller model for faster loading)
         model_id = "openai/whisper-small"
-        
+
         logger.info(f"📥 Loading Whisper model: {model_id}")
         
         # Check if model is already cached
@@ -69,46 +118,101 @@ def setup_whisper_model():
         else:
             logger.info(f"📦 Model not cached, will download to: {model_cache_path}")
         
+        # Optional 4-/8-bit weight-only quantization (CUDA only): the
+        # decoder matmuls are memory-bound, so nf4/int8 weights halve HBM
+        # traffic with negligible WER change. Select via WHISPER_QUANT.
+        quant_mode = os.environ.get('WHISPER_QUANT', 'none').lower()
+        quantization_config = None
+        if quant_mode in ('nf4', 'int8') and torch.cuda.is_available():
+            try:
+                from transformers import BitsAndBytesConfig
+                if quant_mode == 'nf4':
+                    quantization_config = BitsAndBytesConfig(
+                        load_in_4bit=True,
+                        bnb_4bit_quant_type='nf4',
+                        bnb_4bit_compute_dtype=torch.float16,
+                    )
+                else:
+                    quantization_config = BitsAndBytesConfig(load_in_8bit=True)
+                logger.info(f"🔢 Quantizing weights with bitsandbytes ({quant_mode})")
+            except Exception as quant_error:
+                logger.warning(f"⚠️ WHISPER_QUANT={quant_mode} requested but bitsandbytes unavailable, using {torch_dtype}: {quant_error}")
+        elif quant_mode not in ('none', ''):
+            logger.warning(f"⚠️ WHISPER_QUANT={quant_mode} ignored (requires CUDA and one of nf4/int8)")
+
+        if quantization_config is not None:
+            # bitsandbytes places the weights itself; .to(device) is
+            # unsupported on quantized models
+            load_kwargs = dict(
+                low_cpu_mem_usage=True,
+                use_safetensors=True,
+                quantization_config=quantization_config,
+                device_map=device,
+            )
+        else:
+            load_kwargs = dict(
+                dtype=torch_dtype,
+                low_cpu_mem_usage=True,
+                use_safetensors=True,
+            )
+
         # Try to load model with project cache first, fallback to system cache if failed
         model = None
         processor = None
-        
+
         try:
             # First attempt: Use project cache directory
             logger.info(f"🔄 Attempting to load model with project cache: {hf_cache_dir}")
             model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                model_id, 
-                dtype=torch_dtype, 
-                low_cpu_mem_usage=True, 
-                use_safetensors=True,
-                cache_dir=hf_cache_dir
+                model_id,
+                cache_dir=hf_cache_dir,
+                **load_kwargs
             )
             processor = AutoProcessor.from_pretrained(model_id, cache_dir=hf_cache_dir)
             logger.info("✅ Successfully loaded model with project cache")
-            
+
         except Exception as cache_error:
             logger.warning(f"⚠️ Failed to load model with project cache: {cache_error}")
             logger.info("🔄 Falling back to system default cache...")
-            
+
             # Clean up any corrupted cache files
             if os.path.exists(model_cache_path):
                 logger.info(f"🧹 Removing corrupted cache: {model_cache_path}")
                 import shutil
                 shutil.rmtree(model_cache_path, ignore_errors=True)
-            
+
             # Second attempt: Use system default cache (no cache_dir specified)
             model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                model_id, 
-                dtype=torch_dtype, 
-                low_cpu_mem_usage=True, 
-                use_safetensors=True
+                model_id,
+                **load_kwargs
             )
             processor = AutoProcessor.from_pretrained(model_id)
             logger.info("✅ Successfully loaded model with system cache")
-        
-        model.to(device)
-        
+
+        if quantization_config is None:
+            model.to(device)
+
+        # Fused SDPA attention for the encoder/decoder forward:
+        # BetterTransformer when optimum is installed, torch.compile as
+        # the next best thing. Both best-effort — eager still works.
+        try:
+            from optimum.bettertransformer import BetterTransformer
+            model = BetterTransformer.transform(model)
+            logger.info("✅ Applied BetterTransformer (fused SDPA kernels)")
+        except Exception as bt_error:
+            logger.info(f"ℹ️ BetterTransformer unavailable ({bt_error}); trying torch.compile")
+            try:
+                model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=False)
+                logger.info("✅ Compiled model forward with torch.compile")
+            except Exception as compile_error:
+                logger.warning(f"⚠️ torch.compile failed, keeping eager model: {compile_error}")
+
         # Create pipeline with optimized settings for minimal hallucination
+        pipeline_kwargs = {}
+        if quantization_config is None:
+            # Quantized models are already placed by accelerate; the
+            # pipeline rejects an explicit device for them
+            pipeline_kwargs = {"dtype": torch_dtype, "device": device}
         whisper_pipeline = pipeline(
             "automatic-speech-recognition",
             model=model,
@@ -118,10 +222,10 @@ def setup_whisper_model():
             chunk_length_s=30,
             batch_size=16,
             return_timestamps=True,
-            dtype=torch_dtype,
-            device=device,
+            **pipeline_kwargs,
         )
         
+        whisper_backend = 'transformers'
         logger.info("✅ Hugging Face Whisper model loaded successfully")
         return True
         
@@ -130,6 +234,109 @@ def setup_whisper_model():
         logger.error(traceback.format_exc())
         return False
 
+# Common hallucination phrases (Korean and English)
+HALLUCINATION_PHRASES = [
+    # Korean common hallucinations
+    "자막은 설정에서 선택하실 수 있습니다",
+    "구독과 좋아요 부탁드립니다",
+    "시청해주셔서 감사합니다",
+    "다음 영상에서 만나요",
+    "좋아요와 구독 부탁드려요",
+    "구독 좋아요 부탁드립니다",
+    "자막은 설정에서 선택하실수있습니다",
+    "자막은 설정에서 선택하실 수가 있습니다",
+    "시청해 주셔서 감사합니다",
+    "감사합니다",
+    "안녕하세요",
+    "여러분 안녕하세요",
+
+    # English common hallucinations
+    "Thank you for watching",
+    "Please like and subscribe",
+    "Don't forget to hit the bell",
+    "See you in the next video",
+    "Thanks for your attention",
+    "Please subscribe to my channel",
+    "Please subscribe and like",
+    "Subscribe and like",
+    "Thanks for watching",
+    "Don't forget to subscribe",
+    "Hit the subscribe button",
+    "Subtitles by",
+    "Captions by",
+
+    # Generic patterns
+    "음악", "박수", "웃음",
+    "Music", "Applause", "Laughter",
+    "[음악]", "[박수]", "[웃음]",
+    "[Music]", "[Applause]", "[Laughter]"
+]
+
+# Single native pass over the text's codepoints for the character-level
+# stats: repetition counting and special-character classification share
+# one loop, and the per-codepoint dict sidesteps bincount's allocation
+# proportional to the highest codepoint. JIT cost is paid once per
+# process and cached on disk; without numba the vectorized numpy path
+# below does the same work in a few passes.
+try:
+    import numba
+
+    @numba.njit(cache=True)
+    def _scan_codepoints(cps):
+        """Return (max_char_repetitions, n_non_whitespace, n_special)."""
+        counts = dict()
+        n_non_ws = 0
+        n_special = 0
+        for cp in cps:
+            is_ws = cp == 32 or (9 <= cp <= 13)
+            if not is_ws:
+                n_non_ws += 1
+                counts[cp] = counts.get(cp, 0) + 1
+            is_alnum = ((48 <= cp <= 57)      # 0-9
+                        or (65 <= cp <= 90)   # A-Z
+                        or (97 <= cp <= 122))  # a-z
+            is_hangul = 0xAC00 <= cp <= 0xD7A3  # 가-힣
+            if not (is_alnum or is_hangul or is_ws):
+                n_special += 1
+        max_rep = 0
+        for count in counts.values():
+            if count > max_rep:
+                max_rep = count
+        return max_rep, n_non_ws, n_special
+except ImportError:
+    _scan_codepoints = None
+
+# One Aho-Corasick automaton over all lowercased phrases: a single linear
+# pass over the text replaces one substring scan per phrase. Falls back
+# to the per-phrase loop when pyahocorasick isn't installed.
+try:
+    import ahocorasick
+    _HALLUCINATION_AUTOMATON = ahocorasick.Automaton()
+    for _phrase in HALLUCINATION_PHRASES:
+        _HALLUCINATION_AUTOMATON.add_word(_phrase.lower(), _phrase)
+    _HALLUCINATION_AUTOMATON.make_automaton()
+except ImportError:
+    _HALLUCINATION_AUTOMATON = None
+
+# Sound prefilter for the per-phrase fallback loop: if none of the
+# phrases' 4-char prefixes occurs in the text, no phrase can occur, and
+# one C-level regex scan rejects clean text before ~36 substring scans.
+# (With the automaton installed the scan is already a single pass, so
+# the prefilter would only add work there.)
+_PHRASE_PREFIX_RE = re.compile(
+    '|'.join(sorted(re.escape(prefix) for prefix in
+                    {phrase.lower()[:4] for phrase in HALLUCINATION_PHRASES}))
+)
+
+# Compiled fast path: the whole filter in a few native passes (source in
+# filter_hallucinations_rs/, build with `maturin develop` there). The
+# Python implementation below stays as the fallback and the reference
+# for its semantics.
+try:
+    from filter_hallucinations_rs import filter as _filter_hallucinations_native
+except ImportError:
+    _filter_hallucinations_native = None
+
 def filter_hallucinations(text: str) -> str:
     """
     Advanced hallucination filter for Whisper ASR output
@@ -137,53 +344,26 @@ def filter_hallucinations(text: str) -> str:
     """
     if not text or not text.strip():
         return ""
-    
+
+    if _filter_hallucinations_native is not None:
+        filtered = _filter_hallucinations_native(text)
+        if filtered != text.strip():
+            logger.info(f"🔄 [HF-Whisper] Native filter rewrote text: '{text.strip()}' → '{filtered}'")
+        return filtered
+
     text = text.strip()
-    
-    # Common hallucination phrases (Korean and English)
-    hallucination_phrases = [
-        # Korean common hallucinations
-        "자막은 설정에서 선택하실 수 있습니다",
-        "구독과 좋아요 부탁드립니다",
-        "시청해주셔서 감사합니다",
-        "다음 영상에서 만나요",
-        "좋아요와 구독 부탁드려요",
-        "구독 좋아요 부탁드립니다",
-        "자막은 설정에서 선택하실수있습니다",
-        "자막은 설정에서 선택하실 수가 있습니다",
-        "시청해 주셔서 감사합니다",
-        "감사합니다",
-        "안녕하세요",
-        "여러분 안녕하세요",
-        
-        # English common hallucinations
-        "Thank you for watching",
-        "Please like and subscribe",
-        "Don't forget to hit the bell",
-        "See you in the next video",
-        "Thanks for your attention",
-        "Please subscribe to my channel",
-        "Please subscribe and like",
-        "Subscribe and like",
-        "Thanks for watching",
-        "Don't forget to subscribe",
-        "Hit the subscribe button",
-        "Subtitles by",
-        "Captions by",
-        
-        # Generic patterns
-        "음악", "박수", "웃음",
-        "Music", "Applause", "Laughter",
-        "[음악]", "[박수]", "[웃음]",
-        "[Music]", "[Applause]", "[Laughter]"
-    ]
-    
+
     # 1. Common phrase filtering
     text_lower = text.lower()
-    for phrase in hallucination_phrases:
-        if phrase.lower() in text_lower:
+    if _HALLUCINATION_AUTOMATON is not None:
+        for _end, phrase in _HALLUCINATION_AUTOMATON.iter(text_lower):
             logger.info(f"🚫 [HF-Whisper] Filtered hallucination phrase: '{phrase}'")
             return ""
+    elif _PHRASE_PREFIX_RE.search(text_lower) is not None:
+        for phrase in HALLUCINATION_PHRASES:
+            if phrase.lower() in text_lower:
+                logger.info(f"🚫 [HF-Whisper] Filtered hallucination phrase: '{phrase}'")
+                return ""
     
     # 2. Length-based filtering
     if len(text) < 2:
@@ -197,18 +377,14 @@ def filter_hallucinations(text: str) -> str:
     # 3. Repetitive pattern filtering (word level) - Remove duplicates, keep one
     words = text.split()
     if len(words) > 1:
-        word_counts = {}
-        total_words = 0
-        
-        for word in words:
-            if len(word) >= 3:  # Only count words with 3+ characters
-                word_counts[word] = word_counts.get(word, 0) + 1
-                total_words += 1
-        
+        # One C-level counting pass instead of a dict built word by word
+        word_counts = Counter(word for word in words if len(word) >= 3)
+        total_words = sum(word_counts.values())
+
         if total_words > 0:
-            max_repetitions = max(word_counts.values()) if word_counts else 0
+            max_repetitions = max(word_counts.values(), default=0)
             repetition_ratio = max_repetitions / total_words
-            
+
             if repetition_ratio > 0.6:  # 60% repetition threshold
                 # Instead of returning empty, remove duplicates and keep one instance
                 unique_words = []
@@ -219,38 +395,46 @@ def filter_hallucinations(text: str) -> str:
                         unique_words.append(word)
                         if len(word) >= 3:  # Only track longer words for deduplication
                             seen.add(word)
-                
+
                 deduplicated_text = ' '.join(unique_words)
                 logger.info(f"🔄 [HF-Whisper] Removed repetitive pattern: '{text}' → '{deduplicated_text}'")
                 text = deduplicated_text
-    
-    # 4. Repetitive pattern filtering (character level) - Only for extreme cases
-    chars = re.sub(r'\s+', '', text)  # Remove whitespace
-    if len(chars) > 0:
-        char_counts = {}
-        for char in chars:
-            char_counts[char] = char_counts.get(char, 0) + 1
-        
-        max_char_repetitions = max(char_counts.values()) if char_counts else 0
-        char_repetition_ratio = max_char_repetitions / len(chars)
-        
+                words = unique_words
+
+    # 4 + 5. Character-level repetition and special-character filtering —
+    # both stats come from one scan of the codepoints (numba-compiled
+    # when available, vectorized numpy otherwise)
+    cps = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    if _scan_codepoints is not None:
+        max_char_repetitions, n_non_ws, special_chars = _scan_codepoints(cps)
+    else:
+        is_alnum = (((cps >= 48) & (cps <= 57))    # 0-9
+                    | ((cps >= 65) & (cps <= 90))  # A-Z
+                    | ((cps >= 97) & (cps <= 122)))  # a-z
+        is_hangul = (cps >= 0xAC00) & (cps <= 0xD7A3)  # 가-힣
+        is_ws = (cps == 32) | ((cps >= 9) & (cps <= 13))
+        n_non_ws = int((~is_ws).sum())
+        max_char_repetitions = int(np.bincount(cps[~is_ws]).max()) if n_non_ws else 0
+        special_chars = int((~(is_alnum | is_hangul | is_ws)).sum())
+
+    if n_non_ws > 0:
+        char_repetition_ratio = max_char_repetitions / n_non_ws
+
         # Only filter if it's extremely repetitive (90%+) and short
         if char_repetition_ratio > 0.9 and len(text) < 10:
             logger.info(f"🚫 [HF-Whisper] Filtered extreme character repetition: ratio={char_repetition_ratio:.2f}")
             return ""
         elif char_repetition_ratio > 0.6:
             logger.info(f"⚠️ [HF-Whisper] High character repetition detected but keeping text: ratio={char_repetition_ratio:.2f}")
-    
-    # 5. Special character filtering
-    special_chars = len([c for c in text if not re.match(r'[a-zA-Z0-9가-힣\s]', c)])
+
     special_char_ratio = special_chars / len(text) if len(text) > 0 else 0
-    
+
     if special_char_ratio > 0.5:  # 50% special characters threshold
         logger.info(f"🚫 [HF-Whisper] Too many special chars: ratio={special_char_ratio:.2f}")
         return ""
     
     # 6. Consecutive repetition filtering (same word 3+ times in a row) - Remove extras, keep one
-    words = text.split()  # Re-split in case text was modified above
+    # (words is kept in sync with any step-3 rewrite, so no re-split here)
     if len(words) >= 3:
         cleaned_words = []
         i = 0
@@ -275,11 +459,30 @@ def filter_hallucinations(text: str) -> str:
     logger.info(f"✅ [HF-Whisper] Text passed hallucination filter: '{text}'")
     return text
 
-def preprocess_audio(audio_path: str, target_sample_rate: int = 16000) -> Optional[np.ndarray]:
-    """Preprocess audio file for Whisper"""
+# Resample modules cached per (src, dst) rate pair: constructing one
+# redesigns the sinc filter kernel, which dominates the cost for short
+# clips. Cached modules live on the GPU when one is available.
+_RESAMPLERS: Dict[tuple, Any] = {}
+
+def _get_resampler(sample_rate: int, target_sample_rate: int) -> "torchaudio.transforms.Resample":
+    import torchaudio
+    key = (sample_rate, target_sample_rate)
+    resampler = _RESAMPLERS.get(key)
+    if resampler is None:
+        resampler = torchaudio.transforms.Resample(sample_rate, target_sample_rate)
+        if device and str(device).startswith('cuda'):
+            resampler = resampler.to(device)
+        _RESAMPLERS[key] = resampler
+    return resampler
+
+def preprocess_audio(audio_source, target_sample_rate: int = 16000) -> Optional[np.ndarray]:
+    """Preprocess audio (a path or an in-memory buffer) for Whisper"""
+    import torch
+    import torchaudio
+
     try:
         # Load audio using torchaudio
-        audio_data = torchaudio.load(audio_path)
+        audio_data = torchaudio.load(audio_source)
         
         # Ensure we got a tuple (waveform, sample_rate)
         if not isinstance(audio_data, tuple) or len(audio_data) != 2:
@@ -300,9 +503,11 @@ def preprocess_audio(audio_path: str, target_sample_rate: int = 16000) -> Option
             waveform = torch.mean(waveform, dim=0, keepdim=True)
             logger.info("🔄 Converted stereo to mono")
         
-        # Resample if necessary
+        # Resample if necessary (cached kernel, on-GPU when available)
         if sample_rate != target_sample_rate:
-            resampler = torchaudio.transforms.Resample(sample_rate, target_sample_rate)
+            resampler = _get_resampler(sample_rate, target_sample_rate)
+            if device and str(device).startswith('cuda'):
+                waveform = waveform.to(device, non_blocking=True)
             waveform = resampler(waveform)
             logger.info(f"🔄 Resampled from {sample_rate}Hz to {target_sample_rate}Hz")
         
@@ -311,20 +516,26 @@ def preprocess_audio(audio_path: str, target_sample_rate: int = 16000) -> Option
             logger.error(f"❌ Waveform became non-tensor after resampling: {type(waveform)}")
             return None
         
-        # Convert to numpy array and normalize
-        audio_array = waveform.squeeze().numpy()
-        
-        # Normalize to [-1, 1] range
+        # Convert to numpy array and normalize (downstream consumers want
+        # CPU arrays; .cpu() is a no-op when the tensor never left).
+        # .contiguous() makes .numpy() a zero-copy view over the tensor's
+        # storage, so the steps below can work in place on long audio
+        audio_array = waveform.squeeze().contiguous().cpu().numpy()
+
+        # Normalize to [-1, 1] range (in-place division avoids a second
+        # full-length array beyond the unavoidable dtype conversion)
         if audio_array.dtype != np.float32:
             if audio_array.dtype == np.int16:
-                audio_array = audio_array.astype(np.float32) / 32768.0
+                audio_array = audio_array.astype(np.float32)
+                audio_array /= 32768.0
             elif audio_array.dtype == np.int32:
-                audio_array = audio_array.astype(np.float32) / 2147483648.0
-            else:
                 audio_array = audio_array.astype(np.float32)
-        
-        # Ensure proper range
-        audio_array = np.clip(audio_array, -1.0, 1.0)
+                audio_array /= 2147483648.0
+            else:
+                audio_array = audio_array.astype(np.float32, copy=False)
+
+        # Ensure proper range without allocating a fresh array
+        np.clip(audio_array, -1.0, 1.0, out=audio_array)
         
         logger.info(f"✅ Audio preprocessed: shape={audio_array.shape}, dtype={audio_array.dtype}, range=[{audio_array.min():.3f}, {audio_array.max():.3f}]")
         
@@ -335,26 +546,227 @@ def preprocess_audio(audio_path: str, target_sample_rate: int = 16000) -> Option
         logger.error(traceback.format_exc())
         return None
 
+# Silero VAD for the transformers backend: the encoder pads everything
+# to 30 s chunks, so a 2-second utterance costs the full mel + encoder
+# FLOPs. Trimming non-speech first makes encoder cost track actual
+# content. Loaded lazily from torch.hub on first use; faster-whisper
+# already does this itself via vad_filter=True.
+_VAD_MODEL = None
+_VAD_GET_TIMESTAMPS = None
+_vad_failed = False
+_vad_lock = threading.Lock()
+
+def _vad_trim(audio_array: np.ndarray, sampling_rate: int = 16000) -> np.ndarray:
+    """Return only the speech regions of audio_array, or the full audio
+    when VAD is unavailable or finds no speech."""
+    import torch
+
+    global _VAD_MODEL, _VAD_GET_TIMESTAMPS, _vad_failed
+    if _vad_failed:
+        return audio_array
+    if _VAD_MODEL is None:
+        with _vad_lock:
+            if _VAD_MODEL is None and not _vad_failed:
+                try:
+                    vad_model, vad_utils = torch.hub.load(
+                        'snakers4/silero-vad', 'silero_vad', trust_repo=True)
+                    _VAD_GET_TIMESTAMPS = vad_utils[0]  # get_speech_timestamps
+                    _VAD_MODEL = vad_model
+                    logger.info("✅ Silero VAD loaded for pre-encoder trimming")
+                except Exception as vad_error:
+                    logger.warning(f"⚠️ Silero VAD unavailable, feeding untrimmed audio: {vad_error}")
+                    _vad_failed = True
+        if _vad_failed:
+            return audio_array
+    try:
+        timestamps = _VAD_GET_TIMESTAMPS(
+            torch.from_numpy(audio_array), _VAD_MODEL, sampling_rate=sampling_rate)
+    except Exception as vad_error:
+        logger.warning(f"⚠️ VAD pass failed, feeding untrimmed audio: {vad_error}")
+        return audio_array
+    if not timestamps:
+        # No speech found — let Whisper decide rather than sending nothing
+        return audio_array
+    trimmed = np.concatenate([audio_array[t['start']:t['end']] for t in timestamps])
+    logger.info(f"✂️ VAD trimmed {len(audio_array)} → {len(trimmed)} samples "
+                f"({len(timestamps)} speech region(s))")
+    return trimmed
+
+# Dynamic batching for the transformers backend: the pipeline was built
+# with batching capacity, but feeding it one array per request wastes it.
+# Concurrent /asr calls are coalesced here — up to _ASR_BATCH_MAX audios
+# or _ASR_BATCH_WAIT_S of waiting — and run through the pipeline in one
+# call, amortizing kernel launches across requests. faster-whisper
+# transcribes per-clip and bypasses this entirely.
+_ASR_BATCH_MAX = int(os.environ.get('ASR_BATCH_MAX', '8'))
+_ASR_BATCH_WAIT_S = float(os.environ.get('ASR_BATCH_WAIT_MS', '20')) / 1000.0
+
+# GPU log-mel fast path: the pipeline's feature_extractor computes the
+# mel filterbank on CPU with numpy. For clips that fit one 30 s window
+# (the common case here) we compute Whisper's log-mel on the GPU with a
+# cached torchaudio transform and call model.generate directly — the
+# H2D copy also shrinks from raw audio to the mel tensor. Longer audio
+# still goes through the pipeline, which owns the chunking logic.
+_WHISPER_N_SAMPLES = 30 * 16000
+_MEL_TRANSFORM = None
+
+def _gpu_mel_features(audio_array: np.ndarray) -> "torch.Tensor":
+    """Whisper log-mel features for one clip, computed on the GPU."""
+    import torch
+    import torchaudio
+
+    global _MEL_TRANSFORM
+    if _MEL_TRANSFORM is None:
+        _MEL_TRANSFORM = torchaudio.transforms.MelSpectrogram(
+            sample_rate=16000,
+            n_fft=400,
+            hop_length=160,
+            n_mels=80,
+            f_min=0.0,
+            f_max=8000.0,
+            power=2.0,
+            norm='slaney',
+            mel_scale='slaney',
+        ).to(device)
+    wav = torch.from_numpy(audio_array).to(device, non_blocking=True)
+    wav = torch.nn.functional.pad(wav, (0, _WHISPER_N_SAMPLES - wav.numel()))
+    mel = _MEL_TRANSFORM(wav)[:, :-1]  # drop the trailing frame like Whisper
+    # Whisper's dynamic range compression
+    log_spec = torch.clamp(mel, min=1e-10).log10()
+    log_spec = torch.maximum(log_spec, log_spec.max() - 8.0)
+    log_spec = (log_spec + 4.0) / 4.0
+    return log_spec.unsqueeze(0).to(torch_dtype)
+
+def _generate_from_gpu_mel(arrays: List[np.ndarray], generate_kwargs: Dict[str, Any]) -> List[Any]:
+    """Run model.generate on GPU-computed mel features for a batch."""
+    import torch
+
+    features = torch.cat([_gpu_mel_features(arr) for arr in arrays], dim=0)
+    token_ids = whisper_pipeline.model.generate(
+        features, max_new_tokens=128, **generate_kwargs)
+    texts = whisper_pipeline.tokenizer.batch_decode(token_ids, skip_special_tokens=True)
+    return [{'text': text} for text in texts]
+
+_asr_queue: "queue.Queue" = queue.Queue()
+_asr_worker_lock = threading.Lock()
+_asr_worker_started = False
+
+def _run_pipeline_batch(arrays: List[np.ndarray], generate_kwargs: Dict[str, Any]) -> List[Any]:
+    """Run one pipeline call over a batch, retrying without generate_kwargs.
+
+    inference_mode goes beyond no_grad: no autograd graph, no tensor
+    version-counter bookkeeping, slightly less CPU work per call.
+    """
+    import torch
+
+    with torch.inference_mode():
+        if (device and str(device).startswith('cuda')
+                and all(arr.shape[-1] <= _WHISPER_N_SAMPLES for arr in arrays)):
+            try:
+                return _generate_from_gpu_mel(arrays, generate_kwargs)
+            except Exception as mel_error:
+                logger.warning(f"⚠️ GPU mel fast path failed, using pipeline feature extractor: {mel_error}")
+        try:
+            if len(arrays) == 1:
+                return [whisper_pipeline(arrays[0], generate_kwargs=generate_kwargs)]
+            return whisper_pipeline(arrays, batch_size=len(arrays), generate_kwargs=generate_kwargs)
+        except Exception as pipeline_error:
+            logger.warning(f"⚠️ Pipeline failed with generate_kwargs, trying without: {pipeline_error}")
+            if len(arrays) == 1:
+                return [whisper_pipeline(arrays[0])]
+            return whisper_pipeline(arrays, batch_size=len(arrays))
+
+def _asr_batch_worker():
+    while True:
+        batch = [_asr_queue.get()]
+        deadline = time.monotonic() + _ASR_BATCH_WAIT_S
+        requeue = []
+        # Drain compatible requests; ones with different generate_kwargs
+        # (e.g. another language constraint) go back for the next batch
+        while len(batch) < _ASR_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = _asr_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item[1] == batch[0][1]:
+                batch.append(item)
+            else:
+                requeue.append(item)
+        for item in requeue:
+            _asr_queue.put(item)
+
+        arrays = [arr for arr, _kwargs, _future in batch]
+        futures = [future for _arr, _kwargs, future in batch]
+        if len(arrays) > 1:
+            logger.info(f"🧺 Batched {len(arrays)} ASR requests into one pipeline call")
+        try:
+            results = _run_pipeline_batch(arrays, batch[0][1])
+            for future, result in zip(futures, results):
+                future.set_result(result)
+        except Exception as batch_error:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(batch_error)
+
+def _submit_asr(audio_array: np.ndarray, generate_kwargs: Dict[str, Any]) -> Future:
+    global _asr_worker_started
+    if not _asr_worker_started:
+        with _asr_worker_lock:
+            if not _asr_worker_started:
+                threading.Thread(target=_asr_batch_worker, daemon=True,
+                                 name='asr-batch-worker').start()
+                _asr_worker_started = True
+    future: Future = Future()
+    _asr_queue.put((audio_array, generate_kwargs, future))
+    return future
+
+def ensure_model_loaded():
+    """Idempotent model init shared by __main__ and WSGI servers."""
+    if whisper_pipeline is None:
+        if not setup_whisper_model():
+            return False
+    # Bind the hot lookups once: handlers read these out of app.config's
+    # plain dict instead of re-resolving module globals on every request
+    app.config.update(
+        WHISPER=whisper_pipeline,
+        WHISPER_BACKEND=whisper_backend,
+        DEVICE=device,
+        DTYPE=torch_dtype,
+    )
+    return True
+
+# gunicorn imports this module instead of running it, so bring the model
+# up at import time in that case; __main__ does its own init below
+if __name__ != '__main__':
+    ensure_model_loaded()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    global whisper_pipeline
-    
+    cfg = app.config
+    pipe = cfg.get('WHISPER')
+
     status = {
-        'status': 'healthy' if whisper_pipeline is not None else 'unhealthy',
-        'model_loaded': whisper_pipeline is not None,
-        'device': str(device) if device else 'unknown',
-        'torch_dtype': str(torch_dtype) if torch_dtype else 'unknown'
+        'status': 'healthy' if pipe is not None else 'unhealthy',
+        'model_loaded': pipe is not None,
+        'backend': cfg.get('WHISPER_BACKEND') or 'unknown',
+        'device': str(cfg['DEVICE']) if cfg.get('DEVICE') else 'unknown',
+        'torch_dtype': str(cfg['DTYPE']) if cfg.get('DTYPE') else 'unknown'
     }
-    
-    return jsonify(status), 200 if whisper_pipeline else 503
+
+    return jsonify(status), 200 if pipe else 503
 
 @app.route('/asr', methods=['POST'])
 def transcribe_audio():
     """Main ASR endpoint"""
-    global whisper_pipeline
-    
-    if whisper_pipeline is None:
+    cfg = app.config
+    pipe = cfg.get('WHISPER')
+    backend = cfg.get('WHISPER_BACKEND')
+
+    if pipe is None:
         return jsonify({
             'error': 'Whisper model not loaded',
             'details': 'Server initialization failed'
@@ -387,58 +799,59 @@ def transcribe_audio():
         logger.info(f"🎤 Processing audio file: {audio_file.filename}")
         logger.info(f"🌍 Language constraint: {language if language else 'auto-detect'}")
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-            audio_file.save(temp_file.name)
-            temp_audio_path = temp_file.name
-        
+        # Decode straight from the upload buffer — no disk round-trip
+        audio_buffer = io.BytesIO(audio_file.stream.read())
+
         try:
             # Preprocess audio
-            audio_array = preprocess_audio(temp_audio_path)
+            audio_array = preprocess_audio(audio_buffer)
             if audio_array is None:
                 return jsonify({
                     'error': 'Audio preprocessing failed',
                     'details': 'Could not process the audio file'
                 }), 400
             
-            # Prepare pipeline arguments with anti-hallucination settings
-            # Note: Some parameters may not be supported by the ASR pipeline
-            generate_kwargs = {}
-            
-            # Add language constraint if specified
-            if language:
-                generate_kwargs["language"] = language
-                logger.info(f"🌍 Using language constraint: {language}")
-            
-            # Add temperature for conservative output (if supported)
-            try:
-                generate_kwargs["temperature"] = 0.0
-                logger.info("🎯 Temperature set to 0.0 for anti-hallucination")
-            except:
-                logger.info("⚠️ Temperature parameter not supported by this pipeline")
-            
-            # Transcribe using Whisper pipeline
             logger.info("🔄 Starting transcription...")
-            logger.info(f"🎯 Generate kwargs: {generate_kwargs}")
-            
-            # Try transcription with error handling for unsupported parameters
-            try:
-                result = whisper_pipeline(
+
+            if backend == 'faster-whisper':
+                # Greedy decode with conservative settings; VAD trims
+                # non-speech before it ever reaches the decoder
+                segments, _info = pipe.transcribe(
                     audio_array,
-                    generate_kwargs=generate_kwargs
+                    language=language,
+                    beam_size=1,
+                    temperature=0.0,
+                    vad_filter=True,
+                    condition_on_previous_text=False,
                 )
-            except Exception as pipeline_error:
-                logger.warning(f"⚠️ Pipeline failed with generate_kwargs, trying without: {pipeline_error}")
-                # Fallback: try without generate_kwargs
-                result = whisper_pipeline(audio_array)
-            
-            # Extract text from result
-            if isinstance(result, dict) and 'text' in result:
-                transcription = result['text'].strip()
-            elif isinstance(result, list) and len(result) > 0 and 'text' in result[0]:
-                transcription = result[0]['text'].strip()
+                transcription = ''.join(segment.text for segment in segments).strip()
             else:
-                transcription = str(result).strip() if result else ""
+                # Feed the encoder only the speech regions
+                audio_array = _vad_trim(audio_array)
+
+                # Prepare pipeline arguments with anti-hallucination settings
+                # Note: Some parameters may not be supported by the ASR pipeline
+                generate_kwargs = {"temperature": 0.0}
+
+                # Add language constraint if specified
+                if language:
+                    generate_kwargs["language"] = language
+                    logger.info(f"🌍 Using language constraint: {language}")
+
+                logger.info(f"🎯 Generate kwargs: {generate_kwargs}")
+
+                # Submit to the batching worker so concurrent requests
+                # share one pipeline call (unsupported-parameter fallback
+                # happens inside the worker)
+                result = _submit_asr(audio_array, generate_kwargs).result(timeout=120)
+
+                # Extract text from result
+                if isinstance(result, dict) and 'text' in result:
+                    transcription = result['text'].strip()
+                elif isinstance(result, list) and len(result) > 0 and 'text' in result[0]:
+                    transcription = result[0]['text'].strip()
+                else:
+                    transcription = str(result).strip() if result else ""
             
             # Apply hallucination filtering
             transcription = filter_hallucinations(transcription)
@@ -449,19 +862,15 @@ def transcribe_audio():
             response = {
                 'text': transcription,
                 'language_detected': language if language else 'auto',
-                'model': 'openai/whisper-large-v3',
+                'model': f'whisper-small ({backend})',
                 'processing_time': 'N/A'  # Could add timing if needed
             }
             
             return jsonify(response), 200
-            
+
         finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_audio_path)
-            except:
-                pass
-    
+            audio_buffer.close()
+
     except Exception as e:
         logger.error(f"❌ Transcription error: {e}")
         logger.error(traceback.format_exc())
@@ -474,10 +883,11 @@ def transcribe_audio():
 @app.route('/models', methods=['GET'])
 def list_models():
     """List available models"""
+    cfg = app.config
     return jsonify({
         'models': ['openai/whisper-small'],
         'current_model': 'openai/whisper-small',
-        'device': str(device) if device else 'unknown'
+        'device': str(cfg['DEVICE']) if cfg.get('DEVICE') else 'unknown'
     })
 
 if __name__ == '__main__':
@@ -489,6 +899,7 @@ if __name__ == '__main__':
     print(f"🐍 Python version: {python_version}")
     
     # Check PyTorch
+    import torch
     print(f"🔥 PyTorch version: {torch.__version__}")
     print(f"🎯 CUDA available: {torch.cuda.is_available()}")
     if torch.cuda.is_available():
@@ -496,7 +907,7 @@ if __name__ == '__main__':
     
     # Initialize Whisper model
     print("🤖 Loading Hugging Face Whisper model...")
-    if not setup_whisper_model():
+    if not ensure_model_loaded():
         print("❌ Failed to initialize Whisper model")
         sys.exit(1)
     
@@ -1,11 +1,20 @@
 from flask import Flask, request, jsonify, Response
+import struct
 import subprocess
-import uuid
+import threading
+import time
 import os
-import tempfile
-import shutil
 import logging
 import platform
+import numpy as np
+
+# In-process synthesis via AVFoundation (PyObjC, macOS 13+). When these
+# imports fail the server falls back to shelling out to 'say' per request.
+try:
+    import AVFoundation
+    from Foundation import NSDate, NSRunLoop
+except ImportError:
+    AVFoundation = None
 
 app = Flask(__name__)
 
@@ -36,34 +45,178 @@ else:
     logger.info("macOS 'say' command is available and ready")
 
 # Get list of available voices
-def get_available_voices():
-    """Get list of available macOS voices"""
+def get_voice_catalog():
+    """Parse 'say -v ?' once into simple and detailed voice lists"""
     if not MACOS_SAY_AVAILABLE:
-        return []
-    
+        return [], []
+
     try:
-        result = subprocess.run(['say', '-v', '?'], 
+        result = subprocess.run(['say', '-v', '?'],
                               capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            voices = []
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    # Parse voice line format: "VoiceName    language    # description"
-                    parts = line.strip().split()
-                    if parts:
-                        voice_name = parts[0]
-                        voices.append(voice_name)
-            return voices
-        else:
+        if result.returncode != 0:
             logger.error(f"Failed to get voices: {result.stderr}")
-            return []
+            return [], []
+
+        voices_simple = []
+        voices_detailed = []
+        for line in result.stdout.strip().split('\n'):
+            if line.strip():
+                # Parse voice line format: "VoiceName    language    # description"
+                parts = line.strip().split('#', 1)
+                voice_info = parts[0].strip().split()
+                if voice_info:
+                    voice_name = voice_info[0]
+                    language = voice_info[1] if len(voice_info) > 1 else 'unknown'
+                    description = parts[1].strip() if len(parts) > 1 else ''
+
+                    voices_simple.append(voice_name)
+                    voices_detailed.append({
+                        'name': voice_name,
+                        'language': language,
+                        'description': description
+                    })
+        return voices_simple, voices_detailed
     except Exception as e:
         logger.error(f"Error getting voices: {str(e)}")
-        return []
+        return [], []
+
+# Voice catalog is parsed lazily on first use: enumerating voices shells
+# out to 'say', and deferring that lets /health answer the moment the
+# process is up. The installed voice set is static, so after the first
+# call /voices serves from memory unless a refresh is requested
+AVAILABLE_VOICES = []
+VOICES_DETAILED = []
+_voices_loaded = False
+_voices_lock = threading.Lock()
+
+def ensure_voice_catalog():
+    """Populate the voice cache on first use; returns the simple list."""
+    global AVAILABLE_VOICES, VOICES_DETAILED, _voices_loaded
+    if not _voices_loaded:
+        with _voices_lock:
+            if not _voices_loaded:
+                AVAILABLE_VOICES, VOICES_DETAILED = get_voice_catalog()
+                _voices_loaded = True
+                logger.info(f"Found {len(AVAILABLE_VOICES)} macOS voices: {AVAILABLE_VOICES[:5]}{'...' if len(AVAILABLE_VOICES) > 5 else ''}")
+    return AVAILABLE_VOICES
+
+def _avspeech_voice_for_name(name):
+    """Map a 'say' voice name (e.g. 'Albert') to an AVSpeech voice."""
+    for voice in AVFoundation.AVSpeechSynthesisVoice.speechVoices():
+        if voice.name() == name:
+            return voice
+    return None
+
+def synth_with_avspeech(text, voice, rate, sample_rate):
+    """Synthesize in-process via AVSpeechSynthesizer and return WAV bytes.
+
+    No 'say' fork+exec and no AIFF temp file plus transcode: PCM buffers
+    arrive through writeUtterance:toBufferCallback: and are assembled into
+    a 16-bit stereo WAV directly in memory. Returns None on any failure so
+    the caller can fall back to the subprocess path.
+    """
+    done = threading.Event()
+    chunks = []
+    state = {'error': None, 'native_rate': None}
+
+    def on_buffer(buffer):
+        try:
+            frames = int(buffer.frameLength())
+            if frames == 0:
+                # Zero-length buffer marks the end of the utterance
+                done.set()
+                return
+            state['native_rate'] = int(buffer.format().sampleRate())
+            channel_data = buffer.floatChannelData()[0]
+            raw = channel_data.as_buffer(frames * 4)
+            chunks.append(np.frombuffer(raw, dtype=np.float32).copy())
+        except Exception as e:
+            state['error'] = e
+            done.set()
+
+    try:
+        utterance = AVFoundation.AVSpeechUtterance.speechUtteranceWithString_(text)
+        av_voice = _avspeech_voice_for_name(voice)
+        if av_voice is not None:
+            utterance.setVoice_(av_voice)
+        # 'say' rate is words per minute; AVSpeech rate is a 0..1 scalar
+        utterance.setRate_(max(0.0, min(1.0, rate / 400.0)))
+
+        synthesizer = AVFoundation.AVSpeechSynthesizer.alloc().init()
+        synthesizer.writeUtterance_toBufferCallback_(utterance, on_buffer)
+
+        # Buffers are delivered on the run loop, so pump it until the
+        # terminating zero-length buffer (or a timeout) arrives
+        deadline = time.time() + 30
+        while not done.is_set() and time.time() < deadline:
+            NSRunLoop.currentRunLoop().runMode_beforeDate_(
+                'NSDefaultRunLoopMode',
+                NSDate.dateWithTimeIntervalSinceNow_(0.05))
+    except Exception as e:
+        logger.warning(f"AVSpeech synthesis failed, falling back to say: {e}")
+        return None
+
+    if state['error'] is not None or not chunks:
+        if state['error'] is not None:
+            logger.warning(f"AVSpeech buffer callback failed: {state['error']}")
+        return None
 
-# Cache available voices on startup
-AVAILABLE_VOICES = get_available_voices()
-logger.info(f"Found {len(AVAILABLE_VOICES)} macOS voices: {AVAILABLE_VOICES[:5]}{'...' if len(AVAILABLE_VOICES) > 5 else ''}")
+    samples = np.concatenate(chunks)
+    native_rate = state['native_rate'] or sample_rate
+    if native_rate != sample_rate:
+        positions = np.arange(0, len(samples), native_rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+
+    # Duplicate mono into interleaved stereo 16-bit PCM, matching what
+    # the ffmpeg transcode in the subprocess path produces
+    pcm = np.clip(samples * 32767.0, -32768, 32767).astype('<i2')
+    stereo = np.repeat(pcm, 2).tobytes()
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + len(stereo), b'WAVE',
+        b'fmt ', 16, 1, 2, sample_rate,
+        sample_rate * 4, 4, 16,
+        b'data', len(stereo)
+    )
+    return header + stereo
+
+def mono_wav_to_stereo(wav_bytes):
+    """Duplicate the mono channel of a 16-bit WAV into interleaved stereo.
+
+    'say --data-format=LEI16@rate' emits mono, while the in-process path
+    (and the old ffmpeg transcode) return stereo — keep the endpoint's
+    channel count consistent whichever path runs. Returns the input
+    unchanged if it's already stereo or doesn't parse.
+    """
+    try:
+        channels = rate = data_off = data_len = None
+        pos = 12
+        while pos + 8 <= len(wav_bytes):
+            chunk_id, chunk_len = struct.unpack_from('<4sI', wav_bytes, pos)
+            if chunk_id == b'fmt ':
+                channels, = struct.unpack_from('<H', wav_bytes, pos + 10)
+                rate, = struct.unpack_from('<I', wav_bytes, pos + 12)
+            elif chunk_id == b'data':
+                data_off, data_len = pos + 8, chunk_len
+                break
+            # chunks are word-aligned (say pads with an FLLR chunk anyway)
+            pos += 8 + chunk_len + (chunk_len & 1)
+        if channels != 1 or rate is None or data_off is None:
+            return wav_bytes
+        pcm = np.frombuffer(wav_bytes, dtype='<i2', count=data_len // 2,
+                            offset=data_off)
+        stereo = np.repeat(pcm, 2).tobytes()
+        header = struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + len(stereo), b'WAVE',
+            b'fmt ', 16, 1, 2, rate,
+            rate * 4, 4, 16,
+            b'data', len(stereo)
+        )
+        return header + stereo
+    except Exception as e:
+        logger.warning(f"mono->stereo rewrite failed, returning say output as-is: {e}")
+        return wav_bytes
 
 @app.route('/tts', methods=['POST'])
 def tts():
@@ -85,120 +238,60 @@ def tts():
         logger.info(f"🔍 DEBUG Voice type: {type(voice)}, Voice repr: {repr(voice)}")
         
         # Validate voice name
-        if voice not in AVAILABLE_VOICES:
+        if voice not in ensure_voice_catalog():
             logger.warning(f"Voice '{voice}' not found, using default 'Albert'")
             voice = 'Albert'
-        
-        # Create temporary file for output
-        with tempfile.NamedTemporaryFile(suffix='.aiff', delete=False) as temp_file:
-            temp_aiff_path = temp_file.name
-        
-        # Create temporary WAV file path
-        temp_wav_path = temp_aiff_path.replace('.aiff', '.wav')
-        
+
+        # In-process path: no say/ffmpeg subprocesses, no temp files
+        if AVFoundation is not None:
+            audio_data = synth_with_avspeech(text, voice, rate, sample_rate)
+            if audio_data is not None:
+                logger.info(f"Successfully generated {len(audio_data)} bytes of audio (in-process)")
+                return Response(audio_data, mimetype='audio/wav')
+
+        # Subprocess fallback: say emits WAV natively, so stream it to
+        # stdout — no AIFF temp file and no ffmpeg/afconvert transcode
+        # Note: macOS say doesn't support volume control via command line
+        # Volume will be controlled by system volume settings
         try:
-            # Build macOS say command
-            # Note: macOS say doesn't support volume control via command line
-            # Volume will be controlled by system volume settings
             cmd = [
                 'say',
                 '-v', voice,           # voice
                 '-r', str(rate),       # rate (words per minute)
-                '-o', temp_aiff_path,  # output to AIFF file
+                '--file-format=WAVE',
+                '--data-format=LEI16@' + str(sample_rate),
+                '-o', '/dev/stdout',   # stream WAV down the pipe
                 text                   # text to synthesize
             ]
-            
+
             # DEBUG: Log the exact command being run
             logger.info(f"🔍 DEBUG say command: {' '.join(cmd)}")
-            
-            # Run macOS say command
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            
+
+            # Run macOS say command (stdout is binary WAV, stderr is text)
+            result = subprocess.run(cmd, capture_output=True, timeout=10)
+
             if result.returncode != 0:
-                logger.error(f"🔍 DEBUG say stderr: {result.stderr}")
-                logger.error(f"🔍 DEBUG say stdout: {result.stdout}")
-                logger.error(f"macOS say failed: {result.stderr}")
+                stderr_text = result.stderr.decode('utf-8', errors='replace')
+                logger.error(f"🔍 DEBUG say stderr: {stderr_text}")
+                logger.error(f"macOS say failed: {stderr_text}")
                 return jsonify({
                     'error': 'macOS say synthesis failed',
-                    'details': result.stderr
+                    'details': stderr_text
                 }), 500
-            
-            # Check if output file was created
-            if not os.path.exists(temp_aiff_path):
+
+            audio_data = mono_wav_to_stereo(result.stdout)
+            if not audio_data:
                 return jsonify({'error': 'No audio output generated'}), 500
-            
-            # Convert AIFF to WAV using ffmpeg (if available) or afconvert
-            try:
-                # Try ffmpeg first (better quality and more options)
-                ffmpeg_cmd = [
-                    'ffmpeg', '-y',  # -y to overwrite output file
-                    '-i', temp_aiff_path,
-                    '-ar', str(sample_rate),  # set sample rate
-                    '-ac', '2',  # stereo output
-                    '-f', 'wav',  # WAV format
-                    temp_wav_path
-                ]
-                
-                ffmpeg_result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=10)
-                
-                if ffmpeg_result.returncode != 0:
-                    # Fallback to afconvert (built into macOS)
-                    logger.info("ffmpeg failed, falling back to afconvert")
-                    afconvert_cmd = [
-                        'afconvert',
-                        '-f', 'WAVE',  # WAV format
-                        '-d', 'LEI16@' + str(sample_rate),  # 16-bit little-endian at specified sample rate
-                        temp_aiff_path,
-                        temp_wav_path
-                    ]
-                    
-                    afconvert_result = subprocess.run(afconvert_cmd, capture_output=True, text=True, timeout=10)
-                    
-                    if afconvert_result.returncode != 0:
-                        logger.error(f"Both ffmpeg and afconvert failed: {afconvert_result.stderr}")
-                        return jsonify({'error': 'Audio conversion failed'}), 500
-                        
-            except subprocess.TimeoutExpired:
-                return jsonify({'error': 'Audio conversion timeout'}), 500
-            
-            # Check if WAV file was created
-            if not os.path.exists(temp_wav_path):
-                return jsonify({'error': 'WAV conversion failed'}), 500
-            
-            # Read the WAV file
-            with open(temp_wav_path, 'rb') as f:
-                audio_data = f.read()
-            
-            # Clean up temporary files
-            try:
-                os.unlink(temp_aiff_path)
-                os.unlink(temp_wav_path)
-            except OSError:
-                pass  # Ignore cleanup errors
-            
+
             logger.info(f"Successfully generated {len(audio_data)} bytes of audio")
-            
+
             # Return audio data as binary response
             return Response(audio_data, mimetype='audio/wav')
-            
+
         except subprocess.TimeoutExpired:
-            # Clean up on timeout
-            try:
-                os.unlink(temp_aiff_path)
-                if os.path.exists(temp_wav_path):
-                    os.unlink(temp_wav_path)
-            except OSError:
-                pass
             return jsonify({'error': 'macOS say timeout'}), 500
-            
+
         except Exception as e:
-            # Clean up on any other error
-            try:
-                os.unlink(temp_aiff_path)
-                if os.path.exists(temp_wav_path):
-                    os.unlink(temp_wav_path)
-            except OSError:
-                pass
             logger.error(f"Unexpected error: {str(e)}")
             return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
             
@@ -212,53 +305,30 @@ def health():
     return jsonify({
         'status': 'healthy',
         'macos_say_available': MACOS_SAY_AVAILABLE,
+        'in_process': AVFoundation is not None,
         'platform': platform.system(),
         'service': 'macOS Native TTS Server',
-        'voices_count': len(AVAILABLE_VOICES)
+        # Don't force the catalog scan just to answer a health probe
+        'voices_count': len(AVAILABLE_VOICES) if _voices_loaded else None
     })
 
 @app.route('/voices', methods=['GET'])
 def list_voices():
-    """List available macOS voices"""
+    """List available macOS voices (cached; pass ?refresh=1 to re-scan)"""
+    global AVAILABLE_VOICES, VOICES_DETAILED
+
     if not MACOS_SAY_AVAILABLE:
         return jsonify({'error': 'macOS say command is not available'}), 500
-    
-    try:
-        # Get detailed voice information
-        result = subprocess.run(['say', '-v', '?'], 
-                              capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            voices_detailed = []
-            voices_simple = []
-            
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    # Parse voice line format: "VoiceName    language    # description"
-                    parts = line.strip().split('#', 1)
-                    if len(parts) >= 1:
-                        voice_info = parts[0].strip().split()
-                        if voice_info:
-                            voice_name = voice_info[0]
-                            language = voice_info[1] if len(voice_info) > 1 else 'unknown'
-                            description = parts[1].strip() if len(parts) > 1 else ''
-                            
-                            voices_simple.append(voice_name)
-                            voices_detailed.append({
-                                'name': voice_name,
-                                'language': language,
-                                'description': description
-                            })
-            
-            return jsonify({
-                'voices': voices_simple,
-                'voices_detailed': voices_detailed,
-                'count': len(voices_simple),
-                'raw_output': result.stdout.split('\n')
-            })
-        else:
-            return jsonify({'error': 'Failed to list voices'}), 500
-    except Exception as e:
-        return jsonify({'error': f'Error listing voices: {str(e)}'}), 500
+
+    ensure_voice_catalog()
+    if request.args.get('refresh'):
+        AVAILABLE_VOICES, VOICES_DETAILED = get_voice_catalog()
+
+    return jsonify({
+        'voices': AVAILABLE_VOICES,
+        'voices_detailed': VOICES_DETAILED,
+        'count': len(AVAILABLE_VOICES)
+    })
 
 @app.route('/test', methods=['GET'])
 def test_voice():
@@ -291,8 +361,9 @@ def test_voice():
         return jsonify({'error': f'Test error: {str(e)}'}), 500
 
 if __name__ == '__main__':
+    # Dev fallback only; start_macos_tts.sh serves via a gunicorn worker pool
     port = int(os.environ.get('PORT', 5008))  # Use port 5008 for macOS TTS
     logger.info(f"Starting macOS native TTS server on port {port}")
     if MACOS_SAY_AVAILABLE:
-        logger.info(f"Available voices: {len(AVAILABLE_VOICES)} voices found")
-    app.run(host='0.0.0.0', port=port, debug=False)
+        logger.info("Voice catalog will be loaded on first use")
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
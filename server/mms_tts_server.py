@@ -1,15 +1,15 @@
 from asgiref.wsgi import WsgiToAsgi
-from flask import Flask, request, send_file
-import torch
-import uuid
+from flask import Flask, request, send_file, Response
+from functools import lru_cache
+import io
 import os
+import torch
+import torchaudio.functional as AF
 import numpy as np
 import soundfile as sf
 from transformers import VitsModel, AutoTokenizer
-import scipy.io.wavfile
-import tempfile
-import subprocess
 import re
+import struct
 
 app = Flask(__name__)
 
@@ -31,231 +31,366 @@ except Exception as e:
     model = None
     tokenizer = None
 
+if model is not None:
+    model.eval()
+    if device == 'cuda':
+        # cuDNN algorithm autotuning and TF32 matmuls: input shapes only
+        # vary along the token axis, so benchmark mode pays off quickly
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.set_float32_matmul_precision('high')
+
+        # Half-precision weights: the VITS decoder and its HiFi-GAN-style
+        # upsampler are bandwidth-bound, so fp16 halves the traffic and
+        # runs the convs on tensor cores with no audible quality loss
+        model = model.half()
+
+    # TorchInductor fuses the upsampler's elementwise+conv chains and
+    # cuts per-op launch overhead, which dominates on short prompts.
+    # dynamic=True keeps one graph across varying token lengths; not
+    # every VITS subgraph traces cleanly, so fall back to eager
+    try:
+        model = torch.compile(model, mode='reduce-overhead', dynamic=True, fullgraph=False)
+        print("Compiled MMS-TTS model with torch.compile")
+    except Exception as e:
+        print(f"torch.compile unavailable, keeping eager model: {e}")
+
+    # Warm up with a few representative prompt lengths so the first real
+    # request doesn't pay cuDNN algorithm selection and CUDA context init
+    # (and, when compiled, primes Dynamo's shape buckets)
+    try:
+        with torch.inference_mode():
+            for n in (8, 24, 64):
+                warm = tokenizer("a " * n, return_tensors="pt")
+                model(**{k: v.long().to(device) for k, v in warm.items()})
+        print("MMS-TTS warmup complete")
+    except Exception as e:
+        print(f"MMS-TTS warmup failed (continuing): {e}")
+
+# Romanization tables built once at import: rebuilding ~150-entry dicts
+# per request cost thousands of small allocations on the hot path.
+
+# Basic Korean character mappings (Revised Romanization)
+_KOR2ROM = {
+    # Basic consonants
+    'ㄱ': 'g', 'ㄴ': 'n', 'ㄷ': 'd', 'ㄹ': 'r', 'ㅁ': 'm', 
+    'ㅂ': 'b', 'ㅅ': 's', 'ㅇ': '', 'ㅈ': 'j', 'ㅊ': 'ch', 
+    'ㅋ': 'k', 'ㅌ': 't', 'ㅍ': 'p', 'ㅎ': 'h',
+    
+    # Double consonants
+    'ㄲ': 'kk', 'ㄸ': 'tt', 'ㅃ': 'pp', 'ㅆ': 'ss', 'ㅉ': 'jj',
+    
+    # Basic vowels
+    'ㅏ': 'a', 'ㅑ': 'ya', 'ㅓ': 'eo', 'ㅕ': 'yeo', 'ㅗ': 'o', 
+    'ㅛ': 'yo', 'ㅜ': 'u', 'ㅠ': 'yu', 'ㅡ': 'eu', 'ㅣ': 'i',
+    
+    # Complex vowels
+    'ㅐ': 'ae', 'ㅒ': 'yae', 'ㅔ': 'e', 'ㅖ': 'ye', 'ㅘ': 'wa', 
+    'ㅙ': 'wae', 'ㅚ': 'oe', 'ㅝ': 'wo', 'ㅞ': 'we', 'ㅟ': 'wi', 'ㅢ': 'ui'
+}
+
+# Common coding-related words with known romanizations; checked before
+# falling back to character-by-character conversion
+_COMMON_WORDS = {
+    '변수': 'byeonsu',
+    '함수': 'hamsu', 
+    '클래스': 'keullaeseu',
+    '객체': 'gaekche',
+    '배열': 'baeyeol',
+    '문자열': 'munjayeol',
+    '정수': 'jeongsu',
+    '실수': 'silsu',
+    '불린': 'bullin',
+    '조건': 'jogeon',
+    '반복': 'banbok',
+    '메서드': 'meseodeu',
+    '속성': 'sokseong',
+    '상속': 'sangseok',
+    '인터페이스': 'inteopeiseu',
+    '모듈': 'modyul',
+    '패키지': 'paekiji',
+    '라이브러리': 'raibeureori',
+    '프레임워크': 'peureimuweokeu',
+    '데이터베이스': 'deitabeisjeu',
+    '서버': 'seobeoj',
+    '클라이언트': 'keullaienteu',
+    '네트워크': 'neteuwokeu',
+    '보안': 'boan',
+    '암호화': 'amhohwa',
+    '인증': 'injeung',
+    '권한': 'gwonhan',
+    '사용자': 'sayongja',
+    '관리자': 'gwanlija',
+    '설정': 'seoljeong',
+    '구성': 'guseong',
+    '환경': 'hwangyeong',
+    '개발': 'gaebal',
+    '테스트': 'teseuteu',
+    '배포': 'baepo',
+    '버전': 'beojeun',
+    '업데이트': 'eobdeiteu',
+    '버그': 'beogeu',
+    '오류': 'oryu',
+    '예외': 'yeooe',
+    '디버그': 'dibeogu',
+    '로그': 'rogeu',
+    '모니터링': 'moniteoling',
+    '성능': 'seongneung',
+    '최적화': 'choejeokwa',
+    '알고리즘': 'algoriteum',
+    '자료구조': 'jaryogujo',
+    '스택': 'seutaek',
+    '큐': 'kyu',
+    '리스트': 'riseuteu',
+    '딕셔너리': 'diksyeoneori',
+    '해시': 'haesi',
+    '트리': 'teuri',
+    '그래프': 'geuraepeu',
+    '정렬': 'jeongryeol',
+    '검색': 'geomsaek',
+    '파일': 'pail',
+    '폴더': 'poldeo',
+    '디렉토리': 'direktori',
+    '경로': 'gyeongro',
+    '확장자': 'hwakjangja',
+    '압축': 'apchuk',
+    '백업': 'baegeop',
+    '복원': 'bogwon',
+    '동기화': 'donggihwa',
+    '비동기': 'bidongi',
+    '스레드': 'seuledeu',
+    '프로세스': 'peuroseseu',
+    '메모리': 'memori',
+    'CPU': 'sipiyu',
+    'GPU': 'jipiyu',
+    '하드웨어': 'hadeuweeoj',
+    '소프트웨어': 'sopeuteuweeoj',
+    '운영체제': 'unyeongcheje',
+    '윈도우': 'windou',
+    '리눅스': 'rinukseu',
+    '맥': 'maek',
+    '안드로이드': 'andeuroideu',
+    'iOS': 'aioseuseu',
+    '웹': 'web',
+    '브라우저': 'beuraujo',
+    'HTML': 'eichtiemeel',
+    'CSS': 'sieseu',
+    'JavaScript': 'jabaseukeuripteu',
+    'Python': 'paisseon',
+    'Java': 'jaba',
+    'C++': 'si peulleoseu peulleoseu',
+    'C#': 'si syapeu',
+    'PHP': 'pieichipi',
+    'Ruby': 'rubi',
+    'Go': 'go',
+    'Rust': 'reoseteu',
+    'Swift': 'seuwiteu',
+    'Kotlin': 'koteulin',
+    'TypeScript': 'taipeuseukeulipteu',
+    'React': 'riaegteu',
+    'Vue': 'byu',
+    'Angular': 'aenggyulleo',
+    'Node.js': 'nodeujieseu',
+    'Express': 'ikseupeureseu',
+    'Django': 'janggo',
+    'Flask': 'peullaesukeu',
+    'Spring': 'seupeuring',
+    'Laravel': 'rarabel',
+    'Rails': 'reilseu',
+    'MySQL': 'maieskuel',
+    'PostgreSQL': 'poseuteugeurieskuel',
+    'MongoDB': 'monggodibi',
+    'Redis': 'rediseu',
+    'Docker': 'dokeo',
+    'Kubernetes': 'kubernetiseu',
+    'AWS': 'eibeullyueseu',
+    'Azure': 'aejyueo',
+    'GCP': 'jisipi',
+    'Git': 'giteu',
+    'GitHub': 'giteuheobeu',
+    'GitLab': 'giteullaebeu',
+    'Jenkins': 'jenkinseu',
+    'CI/CD': 'siaisildi',
+    'API': 'eipiaiyi',
+    'REST': 'reseut',
+    'GraphQL': 'geuraepeukyuel',
+    'JSON': 'jeiseon',
+    'XML': 'ekseuemeel',
+    'YAML': 'yamel',
+    'Markdown': 'makeudasun',
+    'LaTeX': 'ratek',
+    'PDF': 'pidiepeu',
+    'CSV': 'sibeui',
+    'Excel': 'eksel',
+    'PowerPoint': 'paweopotinteu',
+    'Word': 'wodeu',
+    'Outlook': 'autluk',
+    'Teams': 'timseu',
+    'Slack': 'seullaek',
+    'Discord': 'diseukoedeu',
+    'Zoom': 'jum',
+    'Skype': 'seukaipeu',
+    'Chrome': 'keurom',
+    'Firefox': 'paieopogseu',
+    'Safari': 'sapari',
+    'Edge': 'ejeu',
+    'Internet Explorer': 'inteonet ikseupeulloreo',
+    'Opera': 'opera',
+    'Photoshop': 'potosyop',
+    'Illustrator': 'ilreoseuteureiteo',
+    'InDesign': 'indijain',
+    'Premiere': 'peurimieoj',
+    'After Effects': 'apteo ipekteu',
+    'Final Cut': 'painol keot',
+    'Logic Pro': 'rojik peuro',
+    'GarageBand': 'garejibaendeu',
+    'Xcode': 'ekseukoedeu',
+    'Visual Studio': 'bijueol seutyudio',
+    'IntelliJ': 'intelrijei',
+    'Eclipse': 'iklipseu',
+    'Atom': 'atom',
+    'Sublime Text': 'seobeullaim tekseuteu',
+    'Notepad++': 'noteupaedeu peulleoseu peulleoseu',
+    'Vim': 'bim',
+    'Emacs': 'imaekseu',
+    'Nano': 'nano'
+}
+
+# One C-level scan decides whether the text contains Korean at all
+# (jamo or syllable blocks); non-Korean input returns untouched without
+# ever walking the string in Python
+_HANGUL_RE = re.compile(r'[\u3131-\u3163\uac00-\ud7a3]')
+
+# uroman is the romanizer the MMS project itself uses; it decomposes full
+# syllable blocks properly instead of the 'han' placeholder below. It's
+# optional — without it the table-driven fallback keeps working.
+try:
+    from uroman import Uroman
+    _uroman = Uroman()
+    print("Using uroman for Korean romanization")
+except ImportError:
+    _uroman = None
+
+@lru_cache(maxsize=4096)
 def romanize_korean(text):
     """
-    Simple Korean romanization for MMS-TTS.
+    Korean romanization for MMS-TTS.
     MMS-TTS models expect romanized input, not native Korean script.
-    This is a basic implementation - for production use, consider using uroman.
+    Uses uroman when installed; otherwise falls back to the basic
+    table-driven conversion. Results are cached — screen-reader
+    workloads repeat the same terms constantly.
     """
-    # Korean consonants and vowels mapping to romanization
-    # This is a simplified mapping - MMS-TTS may need more sophisticated preprocessing
-    
-    # Basic Korean character mappings (Revised Romanization)
-    korean_to_roman = {
-        # Basic consonants
-        'ㄱ': 'g', 'ㄴ': 'n', 'ㄷ': 'd', 'ㄹ': 'r', 'ㅁ': 'm', 
-        'ㅂ': 'b', 'ㅅ': 's', 'ㅇ': '', 'ㅈ': 'j', 'ㅊ': 'ch', 
-        'ㅋ': 'k', 'ㅌ': 't', 'ㅍ': 'p', 'ㅎ': 'h',
-        
-        # Double consonants
-        'ㄲ': 'kk', 'ㄸ': 'tt', 'ㅃ': 'pp', 'ㅆ': 'ss', 'ㅉ': 'jj',
-        
-        # Basic vowels
-        'ㅏ': 'a', 'ㅑ': 'ya', 'ㅓ': 'eo', 'ㅕ': 'yeo', 'ㅗ': 'o', 
-        'ㅛ': 'yo', 'ㅜ': 'u', 'ㅠ': 'yu', 'ㅡ': 'eu', 'ㅣ': 'i',
-        
-        # Complex vowels
-        'ㅐ': 'ae', 'ㅒ': 'yae', 'ㅔ': 'e', 'ㅖ': 'ye', 'ㅘ': 'wa', 
-        'ㅙ': 'wae', 'ㅚ': 'oe', 'ㅝ': 'wo', 'ㅞ': 'we', 'ㅟ': 'wi', 'ㅢ': 'ui'
-    }
-    
-    # For now, let's try a simple approach: if the text contains Korean characters,
-    # we'll use a basic phonetic approximation
-    if any('\u3131' <= char <= '\u3163' or '\uac00' <= char <= '\ud7a3' for char in text):
-        # This is Korean text - for now, let's try some common Korean words
-        # In a production system, you'd want proper uroman integration
-        
-        common_words = {
-            '변수': 'byeonsu',
-            '함수': 'hamsu', 
-            '클래스': 'keullaeseu',
-            '객체': 'gaekche',
-            '배열': 'baeyeol',
-            '문자열': 'munjayeol',
-            '정수': 'jeongsu',
-            '실수': 'silsu',
-            '불린': 'bullin',
-            '조건': 'jogeon',
-            '반복': 'banbok',
-            '메서드': 'meseodeu',
-            '속성': 'sokseong',
-            '상속': 'sangseok',
-            '인터페이스': 'inteopeiseu',
-            '모듈': 'modyul',
-            '패키지': 'paekiji',
-            '라이브러리': 'raibeureori',
-            '프레임워크': 'peureimuweokeu',
-            '데이터베이스': 'deitabeisjeu',
-            '서버': 'seobeoj',
-            '클라이언트': 'keullaienteu',
-            '네트워크': 'neteuwokeu',
-            '보안': 'boan',
-            '암호화': 'amhohwa',
-            '인증': 'injeung',
-            '권한': 'gwonhan',
-            '사용자': 'sayongja',
-            '관리자': 'gwanlija',
-            '설정': 'seoljeong',
-            '구성': 'guseong',
-            '환경': 'hwangyeong',
-            '개발': 'gaebal',
-            '테스트': 'teseuteu',
-            '배포': 'baepo',
-            '버전': 'beojeun',
-            '업데이트': 'eobdeiteu',
-            '버그': 'beogeu',
-            '오류': 'oryu',
-            '예외': 'yeooe',
-            '디버그': 'dibeogu',
-            '로그': 'rogeu',
-            '모니터링': 'moniteoling',
-            '성능': 'seongneung',
-            '최적화': 'choejeokwa',
-            '알고리즘': 'algoriteum',
-            '자료구조': 'jaryogujo',
-            '스택': 'seutaek',
-            '큐': 'kyu',
-            '리스트': 'riseuteu',
-            '딕셔너리': 'diksyeoneori',
-            '해시': 'haesi',
-            '트리': 'teuri',
-            '그래프': 'geuraepeu',
-            '정렬': 'jeongryeol',
-            '검색': 'geomsaek',
-            '파일': 'pail',
-            '폴더': 'poldeo',
-            '디렉토리': 'direktori',
-            '경로': 'gyeongro',
-            '확장자': 'hwakjangja',
-            '압축': 'apchuk',
-            '백업': 'baegeop',
-            '복원': 'bogwon',
-            '동기화': 'donggihwa',
-            '비동기': 'bidongi',
-            '스레드': 'seuledeu',
-            '프로세스': 'peuroseseu',
-            '메모리': 'memori',
-            'CPU': 'sipiyu',
-            'GPU': 'jipiyu',
-            '하드웨어': 'hadeuweeoj',
-            '소프트웨어': 'sopeuteuweeoj',
-            '운영체제': 'unyeongcheje',
-            '윈도우': 'windou',
-            '리눅스': 'rinukseu',
-            '맥': 'maek',
-            '안드로이드': 'andeuroideu',
-            'iOS': 'aioseuseu',
-            '웹': 'web',
-            '브라우저': 'beuraujo',
-            'HTML': 'eichtiemeel',
-            'CSS': 'sieseu',
-            'JavaScript': 'jabaseukeuripteu',
-            'Python': 'paisseon',
-            'Java': 'jaba',
-            'C++': 'si peulleoseu peulleoseu',
-            'C#': 'si syapeu',
-            'PHP': 'pieichipi',
-            'Ruby': 'rubi',
-            'Go': 'go',
-            'Rust': 'reoseteu',
-            'Swift': 'seuwiteu',
-            'Kotlin': 'koteulin',
-            'TypeScript': 'taipeuseukeulipteu',
-            'React': 'riaegteu',
-            'Vue': 'byu',
-            'Angular': 'aenggyulleo',
-            'Node.js': 'nodeujieseu',
-            'Express': 'ikseupeureseu',
-            'Django': 'janggo',
-            'Flask': 'peullaesukeu',
-            'Spring': 'seupeuring',
-            'Laravel': 'rarabel',
-            'Rails': 'reilseu',
-            'MySQL': 'maieskuel',
-            'PostgreSQL': 'poseuteugeurieskuel',
-            'MongoDB': 'monggodibi',
-            'Redis': 'rediseu',
-            'Docker': 'dokeo',
-            'Kubernetes': 'kubernetiseu',
-            'AWS': 'eibeullyueseu',
-            'Azure': 'aejyueo',
-            'GCP': 'jisipi',
-            'Git': 'giteu',
-            'GitHub': 'giteuheobeu',
-            'GitLab': 'giteullaebeu',
-            'Jenkins': 'jenkinseu',
-            'CI/CD': 'siaisildi',
-            'API': 'eipiaiyi',
-            'REST': 'reseut',
-            'GraphQL': 'geuraepeukyuel',
-            'JSON': 'jeiseon',
-            'XML': 'ekseuemeel',
-            'YAML': 'yamel',
-            'Markdown': 'makeudasun',
-            'LaTeX': 'ratek',
-            'PDF': 'pidiepeu',
-            'CSV': 'sibeui',
-            'Excel': 'eksel',
-            'PowerPoint': 'paweopotinteu',
-            'Word': 'wodeu',
-            'Outlook': 'autluk',
-            'Teams': 'timseu',
-            'Slack': 'seullaek',
-            'Discord': 'diseukoedeu',
-            'Zoom': 'jum',
-            'Skype': 'seukaipeu',
-            'Chrome': 'keurom',
-            'Firefox': 'paieopogseu',
-            'Safari': 'sapari',
-            'Edge': 'ejeu',
-            'Internet Explorer': 'inteonet ikseupeulloreo',
-            'Opera': 'opera',
-            'Photoshop': 'potosyop',
-            'Illustrator': 'ilreoseuteureiteo',
-            'InDesign': 'indijain',
-            'Premiere': 'peurimieoj',
-            'After Effects': 'apteo ipekteu',
-            'Final Cut': 'painol keot',
-            'Logic Pro': 'rojik peuro',
-            'GarageBand': 'garejibaendeu',
-            'Xcode': 'ekseukoedeu',
-            'Visual Studio': 'bijueol seutyudio',
-            'IntelliJ': 'intelrijei',
-            'Eclipse': 'iklipseu',
-            'Atom': 'atom',
-            'Sublime Text': 'seobeullaim tekseuteu',
-            'Notepad++': 'noteupaedeu peulleoseu peulleoseu',
-            'Vim': 'bim',
-            'Emacs': 'imaekseu',
-            'Nano': 'nano'
-        }
-        
-        # Try to find exact match first
-        if text.strip() in common_words:
-            romanized = common_words[text.strip()]
-            print(f"Romanized '{text}' -> '{romanized}'")
-            return romanized
-        
-        # If no exact match, try basic character-by-character conversion
-        # This is very basic and may not work well for complex Korean text
-        result = ""
-        for char in text:
-            if char in korean_to_roman:
-                result += korean_to_roman[char]
-            elif '\uac00' <= char <= '\ud7a3':  # Korean syllables
-                # This is a Korean syllable - for now, just use a placeholder
-                # In production, you'd decompose the syllable and romanize properly
-                result += "han"  # Generic placeholder
-            else:
-                result += char  # Keep non-Korean characters as-is
-        
-        if result != text:
-            print(f"Basic romanization '{text}' -> '{result}'")
-            return result
-    
-    # If not Korean or no conversion needed, return as-is
+    # Not Korean — nothing to convert
+    if not _HANGUL_RE.search(text):
+        return text
+
+    # Try to find exact match first: the curated table carries
+    # coding-specific pronunciations a general romanizer won't know
+    romanized = _COMMON_WORDS.get(text.strip())
+    if romanized is not None:
+        print(f"Romanized '{text}' -> '{romanized}'")
+        return romanized
+
+    if _uroman is not None:
+        return _uroman.romanize_string(text, lcode='kor')
+
+    # If no exact match, try basic character-by-character conversion
+    # This is very basic and may not work well for complex Korean text
+    # ('han' stands in for full syllable blocks; proper decomposition
+    # would need uroman)
+    result = "".join(
+        [_KOR2ROM.get(char, "han" if '\uac00' <= char <= '\ud7a3' else char)
+         for char in text]
+    )
+
+    if result != text:
+        print(f"Basic romanization '{text}' -> '{result}'")
+        return result
+
+    # No conversion needed, return as-is
     return text
 
+# Pre-warm the cache with the terms a coding screen reader hits
+# constantly so they never pay the romanizer on the request path
+for _word in _COMMON_WORDS:
+    romanize_korean(_word)
+
+@lru_cache(maxsize=512)
+def _tokenize(text):
+    """Tokenize text and return long tensors already on the device.
+
+    A screen-reader workload reads the same keywords and symbols over
+    and over; caching by the romanized string turns repeat tokenization
+    plus the cast and H2D copy into a dict lookup. The model only reads
+    these tensors, so sharing them across requests is safe.
+    """
+    inputs = tokenizer(text, return_tensors="pt")
+    return {k: v.long().to(device, non_blocking=True) for k, v in inputs.items()}
+
+# Callers reading whole paragraphs used to pay one round-trip (and one
+# forward) per sentence; /tts now accepts a list of strings, or splits a
+# long string on sentence boundaries, and synthesizes them as one padded
+# batch
+_SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+def _wav_header(channels, sample_rate, n_samples=None):
+    """44-byte PCM16 WAV header; sizes are left open-ended for streaming."""
+    data_size = 0xFFFFFFFF if n_samples is None else n_samples * channels * 2
+    riff_size = 0xFFFFFFFF if n_samples is None else 36 + data_size
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', riff_size, b'WAVE', b'fmt ', 16, 1, channels,
+                       sample_rate, sample_rate * channels * 2, channels * 2,
+                       16, b'data', data_size)
+
+def _stereo_pcm16(output):
+    """Quantize a waveform tensor to a contiguous stereo int16 buffer.
+
+    Normalizes to 95% full scale and rounds in one fused in-place pass,
+    then duplicates the mono channel without copying the source column.
+    """
+    audio_array = output.squeeze().cpu().numpy()
+    if audio_array.dtype != np.float32:
+        audio_array = audio_array.astype(np.float32)
+    peak = float(np.abs(audio_array).max()) if audio_array.size else 0.0
+    scale = (0.95 * 32767.0 / peak) if peak > 0 else 32767.0
+    np.multiply(audio_array, scale, out=audio_array)
+    np.rint(audio_array, out=audio_array)
+    int16_audio = audio_array.astype(np.int16)
+    return np.ascontiguousarray(
+        np.broadcast_to(int16_audio[:, None], (int16_audio.size, 2)))
+
+def _stream_segments(texts, sample_rate):
+    """Yield a WAV stream, one synthesized segment at a time.
+
+    The first sentence's PCM is on the wire while later sentences are
+    still in the forward pass, so time-to-first-audio is one segment's
+    latency instead of the whole prompt's.
+    """
+    yield _wav_header(2, sample_rate)
+    gap = np.zeros((int(0.1 * sample_rate), 2), dtype=np.int16)
+    model_sample_rate = model.config.sampling_rate
+    with torch.inference_mode():
+        for idx, segment in enumerate(texts):
+            if idx:
+                yield gap.tobytes()
+            output = _synthesize(_tokenize(romanize_korean(segment)))
+            if sample_rate != model_sample_rate:
+                output = AF.resample(output, model_sample_rate, sample_rate,
+                                     lowpass_filter_width=16)
+            pcm = _stereo_pcm16(output)
+            for start in range(0, len(pcm), 8192):
+                yield pcm[start:start + 8192].tobytes()
+
+def _synthesize(inputs):
+    """Run the VITS forward, under fp16 autocast on CUDA."""
+    if device == 'cuda':
+        # autocast keeps layers fp16 can't handle (e.g. the flow
+        # steps) in fp32 while the convs run in half precision
+        with torch.autocast('cuda', dtype=torch.float16):
+            waveform = model(**inputs).waveform
+        return waveform.float()
+    return model(**inputs).waveform
+
 # Expose ASGI application for Uvicorn
 asgi_app = WsgiToAsgi(app)
 
@@ -267,78 +402,71 @@ def tts():
     data = request.json
     text = data['text']
     sample_rate = data.get('sample_rate', 16000)  # MMS-TTS default is 16kHz
-    
-    print(f"Generating TTS for text: '{text}' at {sample_rate}Hz")
-    
-    # Romanize Korean text for MMS-TTS model
-    romanized_text = romanize_korean(text)
-    if romanized_text != text:
-        print(f"Using romanized text: '{romanized_text}'")
-    
+
+    texts = text if isinstance(text, list) else _SENT_SPLIT_RE.split(text)
+    texts = [t for t in texts if t and t.strip()]
+    if not texts:
+        return {"error": "No text provided"}, 400
+
+    print(f"Generating TTS for {len(texts)} segment(s) at {sample_rate}Hz")
+
+    if data.get('stream'):
+        # Chunked response: the WSGI server omits Content-Length for a
+        # generator body, so the client can start playback on the first
+        # chunk. Per-segment forwards trade the batched pass for latency
+        return Response(_stream_segments(texts, sample_rate),
+                        mimetype='audio/wav')
+
     try:
-        # Tokenize the romanized input text
-        inputs = tokenizer(romanized_text, return_tensors="pt")
-        
-        # Fix tensor types - ensure input_ids are Long tensors
-        if 'input_ids' in inputs:
-            inputs['input_ids'] = inputs['input_ids'].long()
-        if 'attention_mask' in inputs:
-            inputs['attention_mask'] = inputs['attention_mask'].long()
-            
-        # Move to device
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        
-        print(f"Input tensor types: {[(k, v.dtype) for k, v in inputs.items()]}")
-        
-        # Generate audio with the model
-        with torch.no_grad():
-            output = model(**inputs).waveform
-        
-        # Convert to numpy array and ensure it's on CPU
-        audio_array = output.squeeze().cpu().numpy()
-        
-        # Ensure the audio is in the correct format
-        if audio_array.dtype != np.float32:
-            audio_array = audio_array.astype(np.float32)
-        
-        # Normalize audio to prevent clipping
-        if np.max(np.abs(audio_array)) > 0:
-            audio_array = audio_array / np.max(np.abs(audio_array)) * 0.95
-        
-        # Generate temporary mono file
-        mono_temp_path = os.path.join('/tmp', f"mms_tts_mono_{uuid.uuid4().hex}.wav")
-        
-        # Save as WAV file using scipy (MMS-TTS outputs at 16kHz by default)
-        model_sample_rate = model.config.sampling_rate
-        scipy.io.wavfile.write(mono_temp_path, model_sample_rate, (audio_array * 32767).astype(np.int16))
-        
-        # Convert mono to stereo if needed
-        stereo_temp_path = os.path.join('/tmp', f"mms_tts_stereo_{uuid.uuid4().hex}.wav")
-        
-        # Read the mono audio
-        mono_audio, sr = sf.read(mono_temp_path)
-        
-        # Resample if requested sample rate is different from model's output
-        if sample_rate != model_sample_rate:
-            import librosa
-            mono_audio = librosa.resample(mono_audio, orig_sr=model_sample_rate, target_sr=sample_rate)
-            sr = sample_rate
-        
-        # Convert mono to stereo by duplicating the channel
-        if len(mono_audio.shape) == 1:  # Ensure it's mono
-            stereo_audio = np.column_stack((mono_audio, mono_audio))
-        else:
-            stereo_audio = mono_audio  # Already stereo or multi-channel
-        
-        # Write as stereo
-        sf.write(stereo_temp_path, stereo_audio, sr)
-        
-        # Clean up mono file
-        if os.path.exists(mono_temp_path):
-            os.remove(mono_temp_path)
-        
-        print(f"Generated audio file: {stereo_temp_path}")
-        return send_file(stereo_temp_path, mimetype='audio/wav')
+        # Generate audio with the model; inference_mode also skips the
+        # tensor version-counter bookkeeping no_grad leaves in place
+        with torch.inference_mode():
+            if len(texts) == 1:
+                # Single segment: keep the cached tokenize path
+                inputs = _tokenize(romanize_korean(texts[0]))
+                output = _synthesize(inputs)
+            else:
+                # Pad the segments into one batch and run a single
+                # forward, then trim each sample back to its real length
+                # (the waveform upsampling factor is uniform, so token
+                # count maps linearly onto samples) and stitch them with
+                # a 100 ms pause
+                batch = tokenizer([romanize_korean(t) for t in texts],
+                                  return_tensors="pt", padding=True)
+                batch = {k: v.long().to(device) for k, v in batch.items()}
+                waveforms = _synthesize(batch)
+
+                mask = batch['attention_mask']
+                hop = waveforms.shape[-1] // mask.shape[-1]
+                gap = torch.zeros(int(0.1 * model.config.sampling_rate),
+                                  device=waveforms.device, dtype=waveforms.dtype)
+                pieces = []
+                for i in range(waveforms.shape[0]):
+                    pieces.append(waveforms[i, :int(mask[i].sum()) * hop])
+                    pieces.append(gap)
+                output = torch.cat(pieces[:-1]).unsqueeze(0)
+
+            # Resample before the waveform ever leaves the device:
+            # torchaudio's polyphase kernel (cached between calls) beats
+            # librosa's Python-level filter by an order of magnitude, and
+            # the smaller post-resample tensor makes the D2H copy cheaper
+            model_sample_rate = model.config.sampling_rate
+            sr = model_sample_rate
+            if sample_rate != model_sample_rate:
+                output = AF.resample(output, model_sample_rate, sample_rate,
+                                     lowpass_filter_width=16)
+                sr = sample_rate
+
+        # Quantize to stereo int16 in one fused pass and encode the WAV
+        # once, entirely in memory (shared with the streaming path)
+        stereo_audio = _stereo_pcm16(output)
+
+        buf = io.BytesIO()
+        sf.write(buf, stereo_audio, sr, format='WAV', subtype='PCM_16')
+        buf.seek(0)
+
+        print(f"Generated {buf.getbuffer().nbytes} bytes of audio (in-memory)")
+        return send_file(buf, mimetype='audio/wav', download_name='tts.wav')
         
     except Exception as e:
         print(f"Error generating TTS: {e}")
@@ -354,4 +482,11 @@ def health():
     }
 
 if __name__ == '__main__':
-    app.run(port=5006, host='0.0.0.0')
+    # Dev fallback; the start script serves via threaded gunicorn. Prefer
+    # uvicorn on the ASGI wrapper so CPU preprocessing overlaps inference
+    port = int(os.environ.get('PORT', 5006))
+    try:
+        import uvicorn
+        uvicorn.run(asgi_app, host='0.0.0.0', port=port)
+    except ImportError:
+        app.run(port=port, host='0.0.0.0', threaded=True)
@@ -2,43 +2,151 @@ from asgiref.wsgi import WsgiToAsgi
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import torch
+import torchaudio.functional as AF
+import io
 import os
-import uuid
+import time
+import queue
+import threading
+import logging
 import numpy as np
+import soundfile as sf
+from concurrent.futures import Future
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Set up torch hub cache directory within the project
+# Per-request chatter lives at DEBUG: print takes the GIL, encodes, and
+# flushes per call, which is measurable next to a <200 ms forward. Set
+# LOGLEVEL=DEBUG to get the old trace back.
+logging.basicConfig(level=os.environ.get('LOGLEVEL', 'INFO'),
+                    format='%(levelname)s:%(name)s:%(message)s')
+log = logging.getLogger('asr')
+
+# One module serves every deployment: port, language, and cache dir all
+# come from env vars instead of edited copies of this file, so a single
+# process (and a single loaded model) handles each configuration
 script_dir = os.path.dirname(os.path.abspath(__file__))
-torch_hub_cache_dir = os.path.join(script_dir, 'models', 'torch_hub_cache')
+torch_hub_cache_dir = os.environ.get(
+    'ASR_HUB_CACHE', os.path.join(script_dir, 'models', 'torch_hub_cache'))
 os.makedirs(torch_hub_cache_dir, exist_ok=True)
 
 # Set torch hub directory to project-local cache
 torch.hub.set_dir(torch_hub_cache_dir)
 
-print(f"[ASR] Using torch hub cache directory: {torch_hub_cache_dir}")
+log.info(f"Using torch hub cache directory: {torch_hub_cache_dir}")
 
 # Initialize device and load the Silero STT model
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-print(f"[ASR] Loading Silero ASR model on device: {device}")
+log.info(f"Loading Silero ASR model on device: {device}")
 
 # Check if model is already cached
 model_cache_path = os.path.join(torch_hub_cache_dir, 'snakers4_silero-models_master')
 if os.path.exists(model_cache_path):
-    print(f"[ASR] Found cached model at: {model_cache_path}")
+    log.info(f"Found cached model at: {model_cache_path}")
 else:
-    print(f"[ASR] Model not cached, will download to: {model_cache_path}")
+    log.info(f"Model not cached, will download to: {model_cache_path}")
 
 model, decoder, utils = torch.hub.load(
     repo_or_dir='snakers4/silero-models',
     model='silero_stt',
-    language='en',  # also supports 'de', 'es'
+    language=os.environ.get('ASR_LANG', 'en'),  # also supports 'de', 'es'
     device=device
 )  #  [oai_citation:0‡PyTorch](https://pytorch.org/hub/snakers4_silero-models_stt/)
 read_batch, split_into_batches, read_audio, prepare_model_input = utils
 
-print(f"[ASR] Silero ASR model loaded successfully")
+if device.type == 'cpu':
+    # Dynamic int8 quantization for CPU-only hosts: 4x smaller linear/
+    # LSTM weights mean 4x less DRAM traffic, and the matmuls run on
+    # FBGEMM int8 kernels. The decoder consumes logits on the CPU either
+    # way, so nothing downstream changes. Conv layers stay fp32 —
+    # dynamic quantization doesn't cover them.
+    try:
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+        log.info("Quantized model to int8 for CPU inference")
+    except Exception as e:
+        log.warning(f"int8 quantization failed, keeping fp32 model: {e}")
+    try:
+        torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # interop thread count can only be set before the pool spins up
+        pass
+
+log.info("Silero ASR model loaded successfully")
+
+# Optional ONNX Runtime backend: Silero ships ONNX exports, and ORT's
+# graph-level fusions typically beat eager PyTorch on the same hardware.
+# Point ASR_ONNX_MODEL at the exported .onnx file to enable it; the
+# session is created once here and reused by the batch worker.
+_onnx_session = None
+_onnx_input_name = None
+_onnx_path = os.environ.get('ASR_ONNX_MODEL')
+if _onnx_path:
+    try:
+        import onnxruntime as ort
+        sess_opts = ort.SessionOptions()
+        sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ['CPUExecutionProvider']
+        if device.type == 'cuda':
+            providers.insert(0, ('CUDAExecutionProvider',
+                                 {'cudnn_conv_algo_search': 'EXHAUSTIVE'}))
+        _onnx_session = ort.InferenceSession(_onnx_path, sess_opts, providers=providers)
+        _onnx_input_name = _onnx_session.get_inputs()[0].name
+        log.info(f"Using ONNX Runtime backend: {_onnx_path}")
+    except Exception as e:
+        log.warning(f"ONNX backend unavailable, using PyTorch model: {e}")
+        _onnx_session = None
+
+# Micro-batching: running the model with batch size one wastes the GPU.
+# Handlers push (waveform, future) pairs onto a queue; a background
+# worker drains up to _ASR_BATCH_MAX items within a _ASR_BATCH_WAIT_S
+# window, pads them through prepare_model_input, and runs one forward
+# for the whole batch, resolving each request's future with its result.
+_ASR_BATCH_MAX = int(os.environ.get('ASR_BATCH_MAX', '16'))
+_ASR_BATCH_WAIT_S = float(os.environ.get('ASR_BATCH_WAIT_MS', '20')) / 1000.0
+_asr_queue = queue.Queue()
+
+def _asr_batch_worker():
+    while True:
+        items = [_asr_queue.get()]
+        deadline = time.monotonic() + _ASR_BATCH_WAIT_S
+        while len(items) < _ASR_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_asr_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        if len(items) > 1:
+            log.debug(f"Batched {len(items)} requests into one forward")
+        try:
+            if _onnx_session is not None:
+                # ORT feeds from host memory, so pad on the CPU and skip
+                # the round-trip through the CUDA tensor
+                input_data = prepare_model_input(
+                    [wav for wav, _ in items], device=torch.device('cpu'))
+                output = torch.from_numpy(_onnx_session.run(
+                    None, {_onnx_input_name: input_data.numpy()})[0])
+            else:
+                input_data = prepare_model_input([wav for wav, _ in items], device=device)
+                output = model(input_data)
+            for (_wav, future), out in zip(items, output):
+                future.set_result(decoder(out.cpu()))
+        except Exception as batch_error:
+            for _wav, future in items:
+                if not future.done():
+                    future.set_exception(batch_error)
+
+threading.Thread(target=_asr_batch_worker, daemon=True, name='asr-batcher').start()
+
+def _submit_asr(wav):
+    future = Future()
+    _asr_queue.put((wav, future))
+    return future
 
 # Wrap the Flask app for ASGI servers if you want to run with Uvicorn/Hypercorn
 asgi_app = WsgiToAsgi(app)
@@ -55,60 +163,58 @@ def health():
 
 @app.route('/asr', methods=['POST'])
 def asr():
-    print(f"[ASR] Received request with content-type: {request.content_type}")
-    print(f"[ASR] Request files: {list(request.files.keys())}")
-    print(f"[ASR] Request form: {list(request.form.keys())}")
-    print(f"[ASR] Request data length: {len(request.data) if request.data else 0}")
-    
-    temp_path = None
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(f"Received request with content-type: {request.content_type}")
+        log.debug(f"Request files: {list(request.files.keys())}")
+        log.debug(f"Request form: {list(request.form.keys())}")
+        # content_length comes from the header; touching request.data here
+        # would materialize the whole body even for form-data uploads
+        log.debug(f"Content length: {request.content_length}")
     
     try:
-        # Handle form data (original method)
+        # Pull the raw bytes straight out of the request — decoding goes
+        # through memory, not a /tmp round-trip
         if 'audio' in request.files:
-            print(f"[ASR] Processing form data audio file")
+            log.debug("Processing form data audio file")
             audio_file = request.files['audio']
-            print(f"[ASR] Audio file received: {audio_file.filename}, size: {len(audio_file.read())}")
-            audio_file.seek(0)  # Reset file pointer
-            
-            temp_path = os.path.join('/tmp', f"asr_{uuid.uuid4().hex}.wav")
-            audio_file.save(temp_path)
-            print(f"[ASR] Saved form audio to: {temp_path}")
-            
+            raw = audio_file.read()
+            log.debug(f"Audio file received: {audio_file.filename}, size: {len(raw)}")
+
         # Handle raw WAV data (new method)
         elif request.content_type == 'audio/wav':
-            print(f"[ASR] Processing raw WAV data")
-            audio_data = request.data
-            print(f"[ASR] Raw audio data received: {len(audio_data)} bytes")
-            
-            temp_path = os.path.join('/tmp', f"asr_{uuid.uuid4().hex}.wav")
-            with open(temp_path, 'wb') as f:
-                f.write(audio_data)
-            print(f"[ASR] Saved raw audio to: {temp_path}")
-            
+            log.debug("Processing raw WAV data")
+            raw = request.data
+            log.debug(f"Raw audio data received: {len(raw)} bytes")
+
         else:
-            print(f"[ASR] Error: No audio file provided. Content-Type: {request.content_type}")
+            log.warning(f"No audio file provided. Content-Type: {request.content_type}")
             return jsonify({'error': 'No audio file provided.'}), 400
 
-        # Process the audio file
-        batches = split_into_batches([temp_path], batch_size=1)
-        input_data = prepare_model_input(read_batch(batches[0]), device=device)
+        # Decode in memory to the 16kHz mono waveform the model expects
+        wav_np, sr = sf.read(io.BytesIO(raw), dtype='float32', always_2d=False)
+        if wav_np.ndim > 1:
+            wav_np = wav_np.mean(axis=1)
+        wav = torch.from_numpy(wav_np)
+        if sr != 16000:
+            wav = AF.resample(wav, sr, 16000)
+
+        # Submit to the micro-batcher; one forward serves every request
+        # that arrived in the same window
+        result = _submit_asr(wav).result(timeout=60)
 
-        # Run inference and decode
-        output = model(input_data)
-        result = decoder(output[0].cpu())
-        
-        print(f"[ASR] Transcription result: {result}")
+        log.debug(f"Transcription result: {result}")
         return jsonify({'text': result})
-        
+
     except Exception as e:
-        print(f"[ASR] Error during processing: {e}")
+        log.error(f"Error during processing: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        # Clean up the temporary file
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
-            print(f"[ASR] Cleaned up: {temp_path}")
 
 if __name__ == '__main__':
-    # Run a WSGI server on port 5003
-    app.run(port=5003)
\ No newline at end of file
+    # Dev fallback; the start script serves via threaded gunicorn. Prefer
+    # uvicorn on the ASGI wrapper so request decode overlaps inference
+    port = int(os.environ.get('PORT', 5003))
+    try:
+        import uvicorn
+        uvicorn.run(asgi_app, host='0.0.0.0', port=port)
+    except ImportError:
+        app.run(port=port, threaded=True)
\ No newline at end of file
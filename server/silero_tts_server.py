@@ -1,5 +1,8 @@
 from asgiref.wsgi import WsgiToAsgi
-from flask import Flask, request, send_file
+from flask import Flask, request, send_file, Response
+import io
+import struct
+import threading
 import torch
 import uuid
 import os
@@ -19,6 +22,79 @@ tts_model = SileroTTS(
     device=device
 )
 
+if device == 'cuda':
+    # cuDNN algorithm autotuning and TF32 matmuls for the synthesis convs
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.set_float32_matmul_precision('high')
+
+# Compile the inner synthesis module to cut per-op launch overhead on
+# short prompts; the SileroTTS wrapper keeps calling it as before. The
+# packaged model may not trace, so fall back to eager on failure
+try:
+    tts_model.model = torch.compile(tts_model.model, mode='reduce-overhead',
+                                    dynamic=True, fullgraph=False)
+    print("Compiled Silero TTS model with torch.compile")
+except Exception as e:
+    print(f"torch.compile unavailable, keeping eager model: {e}")
+
+# Warm up once so the first real request doesn't pay cuDNN algorithm
+# selection and CUDA context init on the critical path (and primes the
+# compiled graph when torch.compile succeeded)
+try:
+    _warm_path = os.path.join('/tmp', f"tts_warmup_{uuid.uuid4().hex}.wav")
+    with torch.inference_mode():
+        tts_model.tts("warm up", _warm_path)
+    os.remove(_warm_path)
+    print("Silero TTS warmup complete")
+except Exception as e:
+    print(f"Silero TTS warmup failed (continuing): {e}")
+
+def _wav_header(channels, sample_rate, n_samples=None):
+    """44-byte PCM16 WAV header; sizes are left open-ended for streaming."""
+    data_size = 0xFFFFFFFF if n_samples is None else n_samples * channels * 2
+    riff_size = 0xFFFFFFFF if n_samples is None else 36 + data_size
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', riff_size, b'WAVE', b'fmt ', 16, 1, channels,
+                       sample_rate, sample_rate * channels * 2, channels * 2,
+                       16, b'data', data_size)
+
+def _stream_segments(texts, speaker, sample_rate):
+    """Yield a WAV stream, one synthesized segment at a time.
+
+    The first sentence's PCM is on the wire while later sentences are
+    still being synthesized, so time-to-first-audio is one segment's
+    latency instead of the whole prompt's.
+    """
+    yield _wav_header(2, sample_rate)
+    gap = np.zeros((int(0.1 * sample_rate), 2), dtype=np.int16)
+    temp_path = os.path.join('/tmp', f"tts_stream_{uuid.uuid4().hex}.wav")
+    try:
+        for idx, segment in enumerate(texts):
+            if idx:
+                yield gap.tobytes()
+            with _tts_lock:
+                # Re-apply per segment: another request may have changed
+                # the shared model's settings between our segments
+                tts_model.speaker = speaker
+                tts_model.sample_rate = sample_rate
+                tts_model.tts(segment, temp_path)
+            piece, _sr = sf.read(temp_path, dtype='int16')
+            if piece.ndim == 1:
+                piece = np.ascontiguousarray(
+                    np.broadcast_to(piece[:, None], (piece.size, 2)))
+            for start in range(0, len(piece), 8192):
+                yield piece[start:start + 8192].tobytes()
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+# The gthread workers share one SileroTTS instance, and its voice and
+# sample rate are configured by mutation before each synthesis — so the
+# set-params+synthesize pair must be atomic or concurrent requests can
+# speak with each other's settings
+_tts_lock = threading.Lock()
+
 # Expose ASGI application for Uvicorn
 asgi_app = WsgiToAsgi(app)
 
@@ -29,34 +105,69 @@ def tts():
     speaker = data.get('speaker', 'en_3')
     sample_rate = data.get('sample_rate', 24000)
 
-    # Update model parameters
-    tts_model.speaker = speaker
-    tts_model.sample_rate = sample_rate
+    # Accept a list of segments and stitch them into one WAV: callers
+    # reading whole paragraphs pay one round-trip and one encode instead
+    # of one per sentence
+    texts = [t for t in text if t and t.strip()] if isinstance(text, list) else [text]
+    if not texts:
+        return {'error': 'No text provided'}, 400
+
+    if data.get('stream'):
+        # Chunked response: the WSGI server omits Content-Length for a
+        # generator body, so the client can start playback on the first
+        # chunk instead of waiting for the whole prompt
+        return Response(_stream_segments(texts, speaker, sample_rate),
+                        mimetype='audio/wav')
 
-    # Generate to a temporary mono file
+    # Generate to a temporary mono file (SileroTTS only writes to a path)
     mono_temp_path = os.path.join('/tmp', f"tts_mono_{uuid.uuid4().hex}.wav")
-    tts_model.tts(text, mono_temp_path)
-    
-    # Convert mono to stereo
-    stereo_temp_path = os.path.join('/tmp', f"tts_stereo_{uuid.uuid4().hex}.wav")
-    
-    # Read the mono audio
-    mono_audio, sr = sf.read(mono_temp_path)
-    
+    pieces = []
+    try:
+        with _tts_lock:
+            # Configure-by-mutation and synthesis must stay atomic on the
+            # shared model (see _tts_lock above)
+            tts_model.speaker = speaker
+            tts_model.sample_rate = sample_rate
+            for segment in texts:
+                tts_model.tts(segment, mono_temp_path)
+                piece, sr = sf.read(mono_temp_path)
+                pieces.append(piece)
+    finally:
+        if os.path.exists(mono_temp_path):
+            os.remove(mono_temp_path)
+
+    if len(pieces) == 1:
+        mono_audio = pieces[0]
+    else:
+        # 100 ms of silence between segments reads naturally
+        gap = np.zeros(int(0.1 * sr), dtype=pieces[0].dtype)
+        joined = []
+        for piece in pieces:
+            joined.append(piece)
+            joined.append(gap)
+        mono_audio = np.concatenate(joined[:-1])
+
     # Convert mono to stereo by duplicating the channel
     if len(mono_audio.shape) == 1:  # Ensure it's mono
-        stereo_audio = np.column_stack((mono_audio, mono_audio))
+        stereo_audio = np.ascontiguousarray(
+            np.broadcast_to(mono_audio[:, None], (mono_audio.size, 2)))
     else:
         stereo_audio = mono_audio  # Already stereo or multi-channel
-    
-    # Write as stereo
-    sf.write(stereo_temp_path, stereo_audio, sr)
-    
-    # Clean up mono file
-    if os.path.exists(mono_temp_path):
-        os.remove(mono_temp_path)
 
-    return send_file(stereo_temp_path, mimetype='audio/wav')
+    # Encode the stereo WAV once, in memory — no second temp file and
+    # no second disk round-trip
+    buf = io.BytesIO()
+    sf.write(buf, stereo_audio, sr, format='WAV', subtype='PCM_16')
+    buf.seek(0)
+
+    return send_file(buf, mimetype='audio/wav', download_name='tts.wav')
 
 if __name__ == '__main__':
-    app.run(port=5002)
\ No newline at end of file
+    # Dev fallback; the start script serves via threaded gunicorn. Prefer
+    # uvicorn on the ASGI wrapper so CPU preprocessing overlaps inference
+    port = int(os.environ.get('PORT', 5002))
+    try:
+        import uvicorn
+        uvicorn.run(asgi_app, host='0.0.0.0', port=port)
+    except ImportError:
+        app.run(port=port, threaded=True)
\ No newline at end of file
@@ -71,4 +71,6 @@ echo ""
 # Execute with error handling - use the detected Python's gunicorn module
 echo -e "${GREEN}🚀 Starting ASR server with $PYTHON_CMD${NC}"
 echo -e "${BLUE}📝 Using gunicorn from: $($PYTHON_CMD -c "import gunicorn; print(gunicorn.__file__)" 2>/dev/null || echo "will be installed")${NC}"
-exec $PYTHON_CMD -m gunicorn --workers 2 --bind 0.0.0.0:$PORT silero_asr_server:app 
\ No newline at end of file
+# One worker keeps a single model copy (and lets the micro-batcher see
+# all traffic); gthread threads overlap CPU decode with GPU inference
+exec $PYTHON_CMD -m gunicorn --workers 1 --worker-class gthread --threads 8 --bind 0.0.0.0:$PORT silero_asr_server:app 
\ No newline at end of file
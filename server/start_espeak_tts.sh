@@ -32,7 +32,9 @@ fi
 
 # Check and install required packages using common function
 if ! check_and_install_packages "$PYTHON_CMD" \
-    "flask" "flask"; then
+    "flask" "flask" \
+    "gunicorn" "gunicorn" \
+    "orjson" "orjson"; then
     exit 1
 fi
 
@@ -45,6 +47,8 @@ if ! kill_port_processes $PORT; then
     exit 1
 fi
 
-# Start the server
+# Start the server with threaded gunicorn workers: synthesis blocks on
+# espeak, so the Flask dev server would serialize concurrent callers
+THREADS=$(getconf _NPROCESSORS_ONLN 2>/dev/null || echo 4)
 echo -e "${GREEN}🚀 eSpeak TTS Server starting on http://localhost:$PORT${NC}"
-exec $PYTHON_CMD espeak_tts_server.py
+exec $PYTHON_CMD -m gunicorn --workers 2 --worker-class gthread --threads "$THREADS" --bind 0.0.0.0:$PORT espeak_tts_server:app
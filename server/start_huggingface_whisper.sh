@@ -95,8 +95,15 @@ echo "🚀 Hugging Face Whisper ASR Server starting on http://localhost:$PORT"
 echo "📝 Logs will appear below..."
 echo "   Press Ctrl+C to stop the server"
 
-# Run the server
-$PYTHON_CMD "$SERVER_SCRIPT"
+# Run the server: one gunicorn worker keeps a single model copy in
+# memory/VRAM while threads handle concurrent requests; fall back to the
+# dev server when gunicorn isn't installed
+if $PYTHON_CMD -c "import gunicorn" 2>/dev/null; then
+    (cd "$SCRIPT_DIR" && $PYTHON_CMD -m gunicorn -w 1 --threads 8 --timeout 120 -b 0.0.0.0:$PORT huggingface_whisper_server:app)
+else
+    echo "⚠️  gunicorn not installed, using Flask dev server"
+    $PYTHON_CMD "$SERVER_SCRIPT"
+fi
 
 # Check exit code
 EXIT_CODE=$?
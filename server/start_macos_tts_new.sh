@@ -45,7 +45,8 @@ fi
 # Check and install required packages using common function
 if ! check_and_install_packages "$PYTHON_CMD" \
     "flask" "flask" \
-    "flask_cors" "flask-cors"; then
+    "flask_cors" "flask-cors" \
+    "gunicorn" "gunicorn"; then
     exit 1
 fi
 
@@ -109,8 +110,10 @@ echo -e "${BLUE}📝 Logs will appear below...${NC}"
 echo -e "${YELLOW}   Press Ctrl+C to stop the server${NC}"
 echo ""
 
-# Run the server with error handling
-$PYTHON_CMD "$SERVER_SCRIPT"
+# Run the server with error handling: say synthesis is subprocess-bound,
+# so a small gunicorn process pool parallelizes requests the Flask dev
+# server would serialize
+(cd "$SCRIPT_DIR" && $PYTHON_CMD -m gunicorn --workers 4 --threads 2 --bind 0.0.0.0:$PORT macos_tts_server:app)
 
 # Check exit code
 EXIT_CODE=$?
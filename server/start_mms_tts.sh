@@ -7,4 +7,4 @@ echo "Installing MMS-TTS dependencies..."
 
 # Start the MMS-TTS server
 echo "Starting MMS-TTS server on port $1..."
-exec /opt/homebrew/opt/python@3.10/Frameworks/Python.framework/Versions/3.10/bin/python3.10 -m gunicorn --workers 1 --bind 0.0.0.0:$1 --timeout 120 mms_tts_server:app
+exec /opt/homebrew/opt/python@3.10/Frameworks/Python.framework/Versions/3.10/bin/python3.10 -m gunicorn --workers 1 --worker-class gthread --threads 4 --bind 0.0.0.0:$1 --timeout 120 mms_tts_server:app
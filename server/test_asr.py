@@ -1,40 +1,276 @@
 #!/usr/bin/env python3
+import os
+
+# Dynamic int8 kernels lose to fp32 under default multithreading — the
+# fbgemm matmuls contend instead of parallelizing — so pin the BLAS/OMP
+# pools to one thread before torch spins them up
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
 import torch
 import numpy as np
-import os
+import sys
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Load the Silero model
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-model, decoder, utils = torch.hub.load(
-    repo_or_dir='snakers4/silero-models',
-    model='silero_stt',
-    language='en',
-    device=device
-)
+if device.type == 'cuda':
+    # Input shapes are fixed by the 16 kHz chunking, so cuDNN's autotuned
+    # conv algorithm selection amortizes after the first forward
+    torch.backends.cudnn.benchmark = True
+# Keep the hub checkout in a project-local cache (same layout as the
+# ASR server) and load from it with source='local' once it exists —
+# that skips torch.hub's per-run GitHub fetch and validation entirely
+script_dir = os.path.dirname(os.path.abspath(__file__))
+hub_cache = os.environ.get(
+    'ASR_HUB_CACHE', os.path.join(script_dir, 'models', 'torch_hub_cache'))
+os.makedirs(hub_cache, exist_ok=True)
+torch.hub.set_dir(hub_cache)
+
+local_repo = os.path.join(hub_cache, 'snakers4_silero-models_master')
+if os.path.isdir(local_repo):
+    model, decoder, utils = torch.hub.load(
+        repo_or_dir=local_repo,
+        model='silero_stt',
+        language='en',
+        device=device,
+        source='local'
+    )
+else:
+    model, decoder, utils = torch.hub.load(
+        repo_or_dir='snakers4/silero-models',
+        model='silero_stt',
+        language='en',
+        device=device
+    )
 read_batch, split_into_batches, read_audio, prepare_model_input = utils
 
+# The hub loader doesn't promise eval mode; make it explicit
+model.eval()
+
+def fuse_conv_bn_relu(module):
+    """Fold conv+BN(+ReLU) triples into single kernels before inference.
+
+    Only does anything for eager nn.Modules; the packaged hub model is
+    TorchScript, where torch.jit.freeze already folds BN into the conv
+    weights at freeze time.
+    """
+    if isinstance(module, torch.jit.ScriptModule):
+        return module
+    for m in module.modules():
+        names = dict(m.named_children())
+        if 'conv' in names and 'bn' in names:
+            targets = ['conv', 'bn'] + (['relu'] if 'relu' in names else [])
+            try:
+                torch.ao.quantization.fuse_modules(m, [targets], inplace=True)
+            except Exception:
+                pass
+    return module
+
+model = fuse_conv_bn_relu(model)
+
+if device.type == 'cpu':
+    # Same dynamic int8 quantization the ASR server applies: linear/LSTM
+    # weights shrink 4x (so 4x less DRAM traffic) and the matmuls run on
+    # the backend's int8 kernels. Conv layers stay fp32 — dynamic
+    # quantization doesn't cover them.
+    try:
+        if 'fbgemm' in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = 'fbgemm'  # x86; ARM uses qnnpack
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+        print("Quantized model to int8 for CPU inference")
+        # Single-threaded runs the int8 path fastest (see the env pinning
+        # at the top of the script)
+        torch.set_num_threads(1)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # interop thread count can only be set before the pool spins up
+            pass
+    except Exception as e:
+        print(f"int8 quantization failed, keeping fp32 model: {e}")
+
+# Freeze and cache the TorchScript model next to the script: torch.jit
+# freezing inlines parameters and lets the JIT fuse the graph, and later
+# runs skip rebuilding the module from hub weights entirely. torch.hub
+# still has to run above for the decoder and utils helpers, which live
+# in the repo's Python code rather than the weights file.
+ts_path = os.environ.get(
+    'ASR_TS_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'silero_ts.pt'))
+try:
+    if os.path.exists(ts_path):
+        if device.type == 'cpu':
+            # mmap pages weights in on demand and lets the OS page cache
+            # share them across invocations instead of deserializing the
+            # whole file into fresh RAM each run (PyTorch >= 2.1)
+            try:
+                model = torch.jit.load(ts_path, mmap=True)
+            except TypeError:
+                model = torch.jit.load(ts_path, map_location=device)
+        else:
+            model = torch.jit.load(ts_path, map_location=device)
+        print(f"Loaded frozen TorchScript model from {ts_path}")
+    else:
+        model = torch.jit.freeze(model.eval())
+        torch.jit.save(model, ts_path)
+        print(f"Saved frozen TorchScript model to {ts_path}")
+except Exception as e:
+    print(f"TorchScript freeze/cache unavailable, keeping hub model: {e}")
+
+if device.type == 'cuda':
+    # Inductor's reduce-overhead mode captures CUDA graphs, removing the
+    # per-op launch latency that dominates sub-second clips. dynamic=False
+    # holds because to_device pads every input to a power-of-two bucket,
+    # so the compiler sees a handful of fixed shapes. The packaged
+    # ScriptModule may refuse to compile — keep it eager then.
+    try:
+        model = torch.compile(model, mode='reduce-overhead', dynamic=False,
+                              fullgraph=False)
+        print("Compiled model with torch.compile (reduce-overhead)")
+    except Exception as e:
+        print(f"torch.compile unavailable, keeping eager model: {e}")
+
+def greedy_decode(logits):
+    """Greedy CTC decode with the argmax done on the device.
+
+    Only the T token ids cross PCIe instead of the full (T, vocab) fp32
+    logits. Follows the Silero label conventions: '_' is the CTC blank
+    and '2' repeats the previous unit. Returns None when the decoder
+    doesn't expose its labels table.
+    """
+    labels = getattr(decoder, 'labels', None)
+    if labels is None:
+        return None
+    tokens = logits.argmax(dim=-1).cpu().tolist()
+    out = []
+    prev = None
+    for t in tokens:
+        if t != prev:
+            label = labels[t]
+            if label == '2':
+                if out:
+                    out.append(out[-1])
+            elif label != '_':
+                out.append(label)
+        prev = t
+    return ''.join(out).strip()
+
+def decode_output(logits):
+    # GPU runs keep the logits on the device and decode greedily; if that
+    # isn't possible, fall back to the hub decoder on a host copy
+    if device.type == 'cuda':
+        text = greedy_decode(logits)
+        if text is not None:
+            return text
+    return decoder(logits.cpu())
+
+def run_model(x):
+    # fp16 autocast on CUDA halves activation traffic and runs the convs
+    # on tensor cores; the logits come back as fp32 for the CTC decoder.
+    # bf16 would also work on Ampere+, but fp16 has the wider support.
+    if device.type == 'cuda':
+        with torch.autocast('cuda', dtype=torch.float16):
+            return model(x).float()
+    return model(x)
+
+if device.type == 'cuda':
+    # Two dummy forwards warm the compiled graph (and cuDNN's algorithm
+    # cache) before any timed work
+    try:
+        with torch.inference_mode():
+            warm = torch.zeros(1, 16384, device=device)
+            for _ in range(2):
+                run_model(warm)
+    except Exception as e:
+        print(f"Warmup failed (continuing): {e}")
+
 # Test with the audio file
 audio_path = "/Users/gillosae/Desktop/lipcoder/client/src/python/hello_v3.wav"
 
-print(f"Testing with audio file: {audio_path}")
-print(f"File exists: {os.path.exists(audio_path)}")
+def load_wav(path):
+    wav = read_audio(path, target_sr=16000)
+    # Convert to tensor without per-element Python traffic: np.asarray
+    # turns a list into one C-level pass, and from_numpy/as_tensor share
+    # the buffer instead of copying when the dtype already matches
+    if isinstance(wav, np.ndarray):
+        wav = torch.from_numpy(np.ascontiguousarray(wav, dtype=np.float32)).flatten()
+    elif isinstance(wav, list):
+        wav = torch.as_tensor(np.asarray(wav, dtype=np.float32)).flatten()
+    elif not torch.is_tensor(wav):
+        raise TypeError(f'Unexpected wav type: {type(wav)}')
+    return wav
+
+
+# For long clips, pipeline chunk preparation with inference: a producer
+# thread slices the waveform and runs prepare_model_input (including the
+# H2D copy) for the next chunk while the main thread's forward pass and
+# decode are still running on the current one
+CHUNK_SAMPLES = 10 * 16000
+
+def to_device(batch):
+    # Pad on the CPU, pin the padded batch (the tensor that actually
+    # crosses PCIe), and copy with non_blocking=True so the DMA overlaps
+    # kernels already queued on the GPU. On CUDA the sample axis is also
+    # padded up to the next power of two so the compiled model only ever
+    # sees a few bucketed shapes (a CUDA-graph capture requirement).
+    if device.type == 'cuda':
+        n = batch.shape[-1]
+        target = 1 << (n - 1).bit_length()
+        if target != n:
+            batch = torch.nn.functional.pad(batch, (0, target - n))
+        return batch.pin_memory().to(device, non_blocking=True)
+    return batch
 
-# Read audio
-wav = read_audio(audio_path, target_sr=16000)
-print(f"Wav type: {type(wav)}")
-print(f"Wav shape: {wav.shape if hasattr(wav, 'shape') else 'no shape'}")
+def transcribe_streamed(wav):
+    work = queue.Queue(maxsize=2)
 
-# Convert to tensor
-if isinstance(wav, np.ndarray):
-    wav = torch.from_numpy(wav).flatten().float()
-elif isinstance(wav, list):
-    wav = torch.tensor(wav, dtype=torch.float32).flatten()
-elif not torch.is_tensor(wav):
-    raise TypeError(f'Unexpected wav type: {type(wav)}')
+    def producer():
+        for start in range(0, wav.numel(), CHUNK_SAMPLES):
+            chunk = wav[start:start + CHUNK_SAMPLES]
+            work.put(to_device(
+                prepare_model_input([chunk], device=torch.device('cpu'))))
+        work.put(None)
 
-print(f"After conversion - Wav type: {type(wav)}")
+    threading.Thread(target=producer, daemon=True).start()
+    texts = []
+    while True:
+        chunk_input = work.get()
+        if chunk_input is None:
+            break
+        with torch.inference_mode():
+            chunk_output = run_model(chunk_input)
+            texts.append(decode_output(chunk_output[0]))
+    return ' '.join(t for t in texts if t)
+
+# Several files on the command line become one padded batch and one
+# forward: batch size 1 leaves the GPU matmul kernels under-utilized,
+# and the decode reads are file-parallel anyway
+audio_paths = sys.argv[1:] or [audio_path]
+if len(audio_paths) > 1:
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        wavs = list(pool.map(load_wav, audio_paths))
+    batch_input = to_device(prepare_model_input(wavs, device=torch.device('cpu')))
+    with torch.inference_mode():
+        batch_output = run_model(batch_input)
+        for path, logits in zip(audio_paths, batch_output):
+            print(f"{path}: {decode_output(logits)}")
+    raise SystemExit(0)
+
+print(f"Testing with audio file: {audio_path}")
+print(f"File exists: {os.path.exists(audio_path)}")
+
+wav = load_wav(audio_path)
 print(f"Wav shape: {wav.shape}")
 
+if wav.numel() > CHUNK_SAMPLES:
+    result = transcribe_streamed(wav)
+    print(f"Result (streamed): {result}")
+    raise SystemExit(0)
+
 # Create batches
 batches = split_into_batches([wav], batch_size=1)
 print(f"Batches type: {type(batches)}")
@@ -42,11 +278,42 @@ print(f"Batches length: {len(batches)}")
 print(f"First batch type: {type(batches[0])}")
 
 # Prepare model input
-input_data = prepare_model_input(batches, device=device)
+input_data = to_device(prepare_model_input(batches, device=torch.device('cpu')))
 print(f"Input data type: {type(input_data)}")
 print(f"Input data shape: {input_data.shape}")
 
-# Run inference
-output = model(input_data)
-result = decoder(output[0].cpu())
+# Optional TensorRT-accelerated path: point ASR_ONNX_MODEL at an .onnx
+# file (exported here on first use) and ONNX Runtime's TensorRT provider
+# runs the forward on fp16/int8 tensor cores, falling back to the CUDA
+# provider and then to eager PyTorch when TensorRT isn't available
+output = None
+onnx_path = os.environ.get('ASR_ONNX_MODEL')
+if onnx_path and device.type == 'cuda':
+    try:
+        import onnxruntime as ort
+        if not os.path.exists(onnx_path):
+            torch.onnx.export(
+                model, input_data, onnx_path, opset_version=17,
+                input_names=['input'],
+                dynamic_axes={'input': {0: 'B', 1: 'T'}})
+            print(f"Exported ONNX model to {onnx_path}")
+        session = ort.InferenceSession(onnx_path, providers=[
+            ('TensorrtExecutionProvider', {'trt_fp16_enable': True}),
+            'CUDAExecutionProvider',
+            'CPUExecutionProvider',
+        ])
+        input_name = session.get_inputs()[0].name
+        output = torch.from_numpy(
+            session.run(None, {input_name: input_data.cpu().numpy()})[0])
+        print(f"Ran inference via ONNX Runtime ({session.get_providers()[0]})")
+    except Exception as e:
+        print(f"ONNX/TensorRT backend unavailable, falling back to eager: {e}")
+        output = None
+
+# Run inference: inference_mode skips autograd's version-counter and
+# view-tracking bookkeeping that no_grad leaves in place
+with torch.inference_mode():
+    if output is None:
+        output = run_model(input_data)
+    result = decode_output(output[0])
 print(f"Result: {result}") 
\ No newline at end of file
@@ -5,7 +5,8 @@ print("💡 Please use MacOS TTS server on port 5008 instead.")
 print("   The MacOS TTS server is more stable and provides better performance.")
 exit(1)
 
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, jsonify, Response
+import zipfile
 import torch
 import uuid
 import os
@@ -20,7 +21,7 @@ import contextlib
 import json
 import time
 import hashlib
-from io import StringIO
+from io import BytesIO, StringIO
 from pathlib import Path
 
 # Configure logging to suppress verbose TTS output
@@ -918,6 +919,94 @@ def tts_fast_endpoint():
         traceback.print_exc()
         return jsonify({"error": f"Fast synthesis failed: {str(e)}"}), 500
 
+@app.route('/tts_batch', methods=['POST'])
+def tts_batch_endpoint():
+    """
+    Batch TTS synthesis: {"items": [{text, language, category, sample_rate}, ...]}
+    Returns a zip of WAV files, one per item, named by item index.
+    One HTTP round-trip for the whole batch, and the model plus cached
+    speaker embeddings stay hot across items.
+    """
+    global xtts_model, xtts_config
+    if xtts_model is None or xtts_config is None:
+        if not load_model():
+            return jsonify({"error": "XTTS-v2 direct model not loaded"}), 500
+
+    data = request.json
+    items = data.get('items', [])
+    if not items:
+        return jsonify({"error": "No items provided"}), 400
+
+    print(f"Batch synthesis for {len(items)} items")
+
+    try:
+        zip_buffer = BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as bundle:
+            for index, item in enumerate(items):
+                text = item['text']
+                language = item.get('language', 'en')
+                category = item.get('category', None)
+                sample_rate = item.get('sample_rate', 24000)
+
+                chosen_speaker_wav = get_speaker_voice(category, language)
+                if not chosen_speaker_wav:
+                    return jsonify({"error": f"No speaker reference for item {index}"}), 400
+
+                # Reuse cached embeddings; extract and cache on first sight
+                cached_embedding = speaker_cache.get_cached_embedding(chosen_speaker_wav)
+                if not cached_embedding:
+                    cached_embedding = speaker_cache.cache_speaker_embedding(
+                        chosen_speaker_wav, xtts_model, xtts_config, category
+                    )
+                if not cached_embedding:
+                    return jsonify({"error": f"Failed to extract speaker embedding for item {index}"}), 500
+
+                outputs = xtts_model.inference(
+                    text,
+                    language,
+                    cached_embedding['gpt_cond_latent'],
+                    cached_embedding['speaker_embedding'],
+                    temperature=0.75,
+                    length_penalty=1.0,
+                    repetition_penalty=2.0,
+                    top_k=50,
+                    top_p=0.9,
+                    enable_text_splitting=True
+                )
+
+                audio_array = outputs['wav']
+                if hasattr(audio_array, 'cpu'):
+                    audio_array = audio_array.cpu().numpy()
+                audio_array = np.array(audio_array)
+
+                # The output is typically at 24kHz, resample if needed
+                original_sr = 24000
+                if sample_rate != original_sr:
+                    import librosa
+                    audio_array = librosa.resample(audio_array, orig_sr=original_sr, target_sr=sample_rate)
+                    sr = sample_rate
+                else:
+                    sr = original_sr
+
+                # Convert mono to stereo
+                if len(audio_array.shape) == 1:
+                    stereo_audio = np.column_stack((audio_array, audio_array))
+                else:
+                    stereo_audio = audio_array
+
+                wav_buffer = BytesIO()
+                sf.write(wav_buffer, stereo_audio, sr, format='WAV')
+                member = f"{index}_{language}_{category or 'default'}.wav"
+                bundle.writestr(member, wav_buffer.getvalue())
+
+        return Response(zip_buffer.getvalue(), mimetype='application/zip')
+
+    except Exception as e:
+        print(f"Error in batch synthesis: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"Batch synthesis failed: {str(e)}"}), 500
+
 @app.route('/clone', methods=['POST'])
 def clone_voice():
     """
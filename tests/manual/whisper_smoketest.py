@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 """
-Simple test to check if Hugging Face Whisper can be loaded
+Manual smoke test: checks that Hugging Face Whisper can be loaded.
+
+Run directly (`python tests/manual/whisper_smoketest.py`). It downloads
+whisper-tiny and loads it into memory, so it deliberately lives outside
+server/ and outside pytest's test_*.py naming — nothing should import
+it during deploys or collection.
 """
 
 import sys